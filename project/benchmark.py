@@ -0,0 +1,119 @@
+"""
+End-to-end benchmark of the mining engines on synthetic datasets.
+
+  python benchmark.py --rows 1000 10000 100000 --output benchmark.csv
+
+For every row count a dataset is generated, then each engine preprocesses
+and mines it from the csv. The wall-clock time covers both steps. Peak
+memory is measured with tracemalloc in a second run, which only sees the
+main process. Every engine must return the same itemsets as the first
+one, and one line per engine and row count is appended to the output csv
+so scaling curves can be compared across releases.
+"""
+import argparse
+import csv
+import datetime
+import os
+import tempfile
+import time
+import tracemalloc
+from preprocess import DEFAULT_SETTINGS
+from encoding import get_transaction_store
+from mining import mine, ENGINES
+from synthetic import generate_dataset
+
+FIELDS = ['label', 'rows', 'locations', 'months', 'compounds', 'correlation', 'min_support', 'engine', 'seconds', 'peak_mb', 'itemsets', 'matches']
+
+def run_engine(filename, engine, min_support, settings=DEFAULT_SETTINGS, workers=1):
+  # preprocessing and mining, as a run of the engine script does
+  store = get_transaction_store(filename, settings=settings)
+  return mine(store, engine, min_support, workers)
+
+def time_engine(filename, engine, min_support, settings=DEFAULT_SETTINGS, workers=1):
+  start = time.perf_counter()
+  result = run_engine(filename, engine, min_support, settings, workers)
+  return time.perf_counter() - start, result
+
+def get_peak_memory(filename, engine, min_support, settings=DEFAULT_SETTINGS, workers=1):
+  # peak of the python and numpy allocations in MB
+  tracemalloc.start()
+  try:
+    run_engine(filename, engine, min_support, settings, workers)
+    return tracemalloc.get_traced_memory()[1] / float(1 << 20)
+  finally:
+    tracemalloc.stop()
+
+def get_itemset_count(result):
+  return sum(len(itemsets) for level in result.values() for itemsets in level.values())
+
+def run_benchmark(rows_list, engines=ENGINES, locations=10, months=12, compound_count=3, correlation=0.5, min_support=3, workers=1, memory=True, seed=0, label=None):
+  """
+  Benchmark engines on a dataset of every size in rows_list and return a
+  list of dicts with the FIELDS keys.
+  """
+  if label is None:
+    label = datetime.date.today().isoformat()
+  # import pandas and the engines up front so the first run is not charged for it
+  import pandas
+  for engine in engines:
+    mine([[['so21', 'no21'], 'City', 'January']], engine, min_support)
+  lines = []
+  with tempfile.TemporaryDirectory() as directory:
+    for rows in rows_list:
+      filename = os.path.join(directory, 'rows_%d.csv' % rows)
+      settings = dict(DEFAULT_SETTINGS)
+      settings['compounds'] = generate_dataset(filename, rows, locations, months, compound_count, correlation, seed)
+      first_result = None
+      for engine in engines:
+        seconds, result = time_engine(filename, engine, min_support, settings, workers)
+        if first_result is None:
+          first_result = result
+        peak_mb = get_peak_memory(filename, engine, min_support, settings, workers) if memory else None
+        lines.append({
+          'label': label, 'rows': rows, 'locations': locations, 'months': months,
+          'compounds': compound_count, 'correlation': correlation, 'min_support': min_support,
+          'engine': engine, 'seconds': round(seconds, 4),
+          'peak_mb': None if peak_mb is None else round(peak_mb, 2),
+          'itemsets': get_itemset_count(result), 'matches': result == first_result
+        })
+  return lines
+
+def write_lines(lines, output):
+  is_new = not os.path.exists(output)
+  with open(output, 'a', newline='') as f:
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    if is_new:
+      writer.writeheader()
+    writer.writerows(lines)
+
+def print_lines(lines):
+  from prettytable import PrettyTable
+  table = PrettyTable(['Rows', 'Engine', 'Seconds', 'Peak MB', 'Itemsets', 'Matches'])
+  for line in lines:
+    table.add_row([line['rows'], line['engine'], line['seconds'], line['peak_mb'], line['itemsets'], line['matches']])
+  print(table)
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the mining engines on synthetic data.')
+  parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+  parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+  parser.add_argument('--locations', type=int, default=10)
+  parser.add_argument('--months', type=int, default=12)
+  parser.add_argument('--compounds', type=int, default=3)
+  parser.add_argument('--correlation', type=float, default=0.5)
+  parser.add_argument('--min-support', type=int, default=3)
+  parser.add_argument('--workers', type=int, default=1)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+  parser.add_argument('--label', help='name of this run in the output, default today')
+  parser.add_argument('--output', help='csv file the lines are appended to')
+  args = parser.parse_args()
+  lines = run_benchmark(args.rows, args.engines, args.locations, args.months, args.compounds, args.correlation, args.min_support, args.workers, not args.no_memory, args.seed, args.label)
+  print_lines(lines)
+  if args.output:
+    write_lines(lines, args.output)
+  if not all(line['matches'] for line in lines):
+    raise SystemExit('engines returned different itemsets')
+
+if '__main__' == __name__:
+  main()
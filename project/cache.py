@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import numpy as np
+from preprocess import DEFAULT_SETTINGS, get_discretisation_settings
+from encoding import TransactionStore, get_transaction_store
+from stats import STATS
+
+CACHE_VERSION = 4
+ARRAYS = ['offsets', 'item_ids', 'cell_offsets']
+
+def get_file_hash(filename, block_size=1 << 20):
+  file_hash = hashlib.sha256()
+  with open(filename, 'rb') as f:
+    for block in iter(lambda: f.read(block_size), b''):
+      file_hash.update(block)
+  return file_hash.hexdigest()
+
+def get_cache_key(filename, settings=DEFAULT_SETTINGS):
+  # content of the csv plus the preprocessing settings, every one of which
+  # changes the items or the cells of the transactions
+  key_data = {
+    'version': CACHE_VERSION,
+    'file': get_file_hash(filename),
+    'settings': settings
+  }
+  return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()[:32]
+
+def save_transaction_store(store, path):
+  # arrays as .npy next to a json file for the names, the bin edges and
+  # the spatial hierarchy, written to a temporary directory first so a
+  # reader never sees half a cache entry
+  tmp_path = path + '.tmp%d' % os.getpid()
+  os.makedirs(tmp_path)
+  for name in ARRAYS:
+    np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(getattr(store, name)))
+  meta = {
+    'version': CACHE_VERSION,
+    'items': store.items,
+    'cells': store.cells,
+    'bin_edges': {prefix: [float(edge) for edge in edges] for prefix, edges in (store.bin_edges or {}).items()},
+    'location_parents': store.location_parents
+  }
+  with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+    json.dump(meta, f)
+  try:
+    os.rename(tmp_path, path)
+  except OSError:
+    # another run cached the same key first
+    for name in os.listdir(tmp_path):
+      os.remove(os.path.join(tmp_path, name))
+    os.rmdir(tmp_path)
+
+def load_transaction_store(path):
+  # the arrays are memory mapped, so loading reads only the json file
+  with open(os.path.join(path, 'meta.json')) as f:
+    meta = json.load(f)
+  if meta['version'] != CACHE_VERSION:
+    return None
+  arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in ARRAYS]
+  cells = [tuple(cell) for cell in meta['cells']]
+  bin_edges = {prefix: np.array(edges) for prefix, edges in meta['bin_edges'].items()}
+  return TransactionStore(meta['items'], cells, arrays[0], arrays[1], arrays[2], bin_edges, meta['location_parents'])
+
+def get_cached_transaction_store(filename, chunk_size=10000, settings=DEFAULT_SETTINGS, cache_dir=None):
+  """
+  get_transaction_store through an on-disk cache in cache_dir keyed by the
+  content of filename and the discretisation settings. Without a cache_dir
+  the file is always preprocessed.
+  """
+  if cache_dir is None:
+    return get_transaction_store(filename, chunk_size, settings)
+  path = os.path.join(cache_dir, get_cache_key(filename, settings))
+  if os.path.exists(os.path.join(path, 'meta.json')):
+    with STATS.phase('cache_load'):
+      store = load_transaction_store(path)
+    if store is not None:
+      return store
+  store = get_transaction_store(filename, chunk_size, settings)
+  os.makedirs(cache_dir, exist_ok=True)
+  if not os.path.exists(path):
+    save_transaction_store(store, path)
+  return store
+
+def load_store(config_data):
+  # the TransactionStore of the filename of config.ini, preprocessed with
+  # its settings and chunk_size through its cache_dir
+  settings = get_discretisation_settings(config_data)
+  chunk_size = int(config_data.get('chunk_size', 10000))
+  return get_cached_transaction_store(config_data['filename'], chunk_size, settings, config_data.get('cache_dir'))
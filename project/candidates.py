@@ -0,0 +1,62 @@
+from stats import STATS
+
+def generate_candidates(itemsets, phase='candidate_generation', counter='candidates'):
+  # apriori-gen: join (k-1)-itemsets sharing their first k-2 items and
+  # drop every candidate with an infrequent (k-1)-subset; itemsets are
+  # ascending tuples of item ids. The joins are timed as phase and
+  # counted as counter_generated and counter_pruned
+  with STATS.phase(phase):
+    itemsets = sorted(set(itemsets))
+    frequent = set(itemsets)
+    candidates = []
+    joined = 0
+    start = 0
+    while start < len(itemsets):
+      prefix = itemsets[start][:-1]
+      end = start
+      while end < len(itemsets) and itemsets[end][:-1] == prefix:
+        end += 1
+      joined += (end-start) * (end-start-1) // 2
+      for i in range(start, end):
+        for j in range(i+1, end):
+          candidate = itemsets[i] + itemsets[j][-1:]
+          is_frequent_subsets = True
+          # the subsets dropping one of the last two items are the join inputs
+          for k in range(len(candidate)-2):
+            if not candidate[:k] + candidate[k+1:] in frequent:
+              is_frequent_subsets = False
+              break
+          if is_frequent_subsets:
+            candidates.append(candidate)
+      start = end
+  STATS.count(counter + '_generated', joined)
+  STATS.count(counter + '_pruned', joined - len(candidates))
+  return candidates
+
+def get_candidate_trie(candidates):
+  trie = {}
+  for candidate in candidates:
+    node = trie
+    for item in candidate[:-1]:
+      node = node.setdefault(item, ({}, None))[0]
+    children = node[candidate[-1]][0] if candidate[-1] in node else {}
+    node[candidate[-1]] = (children, candidate)
+  return trie
+
+def count_candidates(candidates, tid_bitsets):
+  # walk a prefix trie of the candidates once, carrying the tid-set
+  # intersection of the prefix down so shared prefixes are ANDed only once
+  STATS.count('support_scans')
+  STATS.count('candidates_counted', len(candidates))
+  with STATS.phase('support_counting'):
+    supports = {}
+    stack = [(get_candidate_trie(candidates), -1)]
+    while len(stack) > 0:
+      node, bits = stack.pop()
+      for item, (children, candidate) in node.items():
+        item_bits = bits & tid_bitsets.get(item, 0)
+        if candidate is not None:
+          supports[candidate] = item_bits.bit_count()
+        if item_bits and len(children) > 0:
+          stack.append((children, item_bits))
+    return supports
@@ -0,0 +1,76 @@
+"""
+Closed and maximal itemsets out of the frequent itemsets of a cell.
+
+A frequent itemset is closed when no superset has the same support, and
+maximal when no superset is frequent at all. The engines without a
+closed or maximal miner of their own filter their output with these.
+"""
+ITEMSETS = ['all', 'closed', 'maximal']
+
+def get_closed_itemsets(itemsets):
+  # itemsets: every frequent itemset of two or more items of a cell as
+  # (itemset, count, ...). A superset with the same support can always be
+  # found one item larger, so comparing each itemset with its subsets one
+  # item smaller is enough
+  supports = {}
+  for itemset in itemsets:
+    supports[frozenset(itemset[0])] = itemset[1]
+  not_closed = set()
+  for items, support in supports.items():
+    if len(items) < 3:
+      continue
+    for item in items:
+      subset = items - {item}
+      if supports.get(subset) == support:
+        not_closed.add(subset)
+  return [itemset for itemset in itemsets if not frozenset(itemset[0]) in not_closed]
+
+def get_maximal_itemsets(itemsets):
+  # itemsets: the frequent or the closed itemsets of a cell; the largest
+  # come first so every maximal itemset is kept before its subsets
+  maximal = []
+  maximal_sets = []
+  for itemset in sorted(itemsets, key=lambda itemset: len(itemset[0]), reverse=True):
+    items = frozenset(itemset[0])
+    if not any(items < maximal_set for maximal_set in maximal_sets):
+      maximal.append(itemset)
+      maximal_sets.append(items)
+  return maximal
+
+def get_unsubsumed_itemsets(itemsets):
+  # drop the itemsets with a proper superset of the same support among
+  # itemsets, for closed candidates that may miss part of their closure
+  by_support = {}
+  for itemset in itemsets:
+    if itemset[1] in by_support:
+      by_support[itemset[1]].append(itemset)
+    else:
+      by_support[itemset[1]] = [itemset]
+  unsubsumed = []
+  for same_support in by_support.values():
+    unsubsumed.extend(get_maximal_itemsets(same_support))
+  return unsubsumed
+
+def filter_itemsets(cell_itemsets, itemsets='all'):
+  # the closed or maximal ones of the frequent itemsets of one cell
+  if not itemsets in ITEMSETS:
+    raise ValueError('unknown itemsets: ' + itemsets)
+  if itemsets == 'closed':
+    return get_closed_itemsets(cell_itemsets)
+  if itemsets == 'maximal':
+    return get_maximal_itemsets(cell_itemsets)
+  return cell_itemsets
+
+def filter_star_itemsets(star_itemsets, itemsets='all'):
+  """
+  Keep the closed or maximal itemsets of every cell of the
+  [zero, one, two] star itemsets of an engine.
+  """
+  if not itemsets in ITEMSETS:
+    raise ValueError('unknown itemsets: ' + itemsets)
+  if itemsets == 'all':
+    return star_itemsets
+  filtered = []
+  for itemsets_by_cell in star_itemsets:
+    filtered.append({cell: filter_itemsets(cell_itemsets, itemsets) for cell, cell_itemsets in itemsets_by_cell.items()})
+  return filtered
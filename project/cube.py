@@ -0,0 +1,61 @@
+from stats import STATS
+
+# levels of a mined result, by the number of stars of a cell
+LEVELS = ['zero_star', 'one_star', 'two_star']
+
+def get_star_cells(location_time_star_items):
+  # cell index: (location, time) -> the star cells it is rolled up into
+  one_star_location = set(location_time_star_items[0])
+  one_star_time = set(location_time_star_items[1])
+  star_cells = {}
+  for location, time in location_time_star_items[2]:
+    star_cells[(location, time)] = []
+    if location in one_star_location:
+      star_cells[(location, time)].append((location, '*'))
+    if time in one_star_time:
+      star_cells[(location, time)].append(('*', time))
+    star_cells[(location, time)].append(('*', '*'))
+  return star_cells
+
+def rollup_cells(values_by_cell, star_cells, merge):
+  # every cell feeds at most three star cells, so the roll-up is linear
+  # in the number of cells; merge combines the list of child values
+  with STATS.phase('star_aggregation'):
+    children_by_star_cell = {}
+    for cell, value in values_by_cell.items():
+      for star_cell in star_cells[cell]:
+        if star_cell in children_by_star_cell:
+          children_by_star_cell[star_cell].append(value)
+        else:
+          children_by_star_cell[star_cell] = [value]
+    rolled_up = {}
+    for star_cell, children in children_by_star_cell.items():
+      rolled_up[star_cell] = merge(children)
+    return rolled_up
+
+def merge_counts(children):
+  counts = {}
+  for child in children:
+    for key, count in child.items():
+      counts[key] = counts.get(key, 0) + count
+  return counts
+
+def get_star_itemsets(final_itemsets, star_final_itemsets):
+  zero_star_itemsets = {}
+  one_star_itemsets = {}
+  two_star_itemsets = {('*', '*'): []}
+  for itemset in final_itemsets:
+    if itemset[2] in zero_star_itemsets:
+      zero_star_itemsets[itemset[2]].append(itemset)
+    else:
+      zero_star_itemsets[itemset[2]] = [itemset]
+  for itemset in star_final_itemsets:
+    if itemset[2] == ('*', '*'):
+      star_itemsets = two_star_itemsets
+    else:
+      star_itemsets = one_star_itemsets
+    if itemset[2] in star_itemsets:
+      star_itemsets[itemset[2]].append((itemset[0], itemset[1]))
+    else:
+      star_itemsets[itemset[2]] = [(itemset[0], itemset[1])]
+  return [zero_star_itemsets, one_star_itemsets, two_star_itemsets]
@@ -0,0 +1,182 @@
+import datetime
+from functools import partial
+from utils import print_table, get_star_items_of_location_times, get_config_info
+from encoding import decode_itemsets
+from cache import load_store
+from support import get_vertical_layout_by_cell, get_tid_bitsets_size, merge_tid_bitsets, check_min_support
+from cube import get_star_cells, rollup_cells, get_star_itemsets
+from parallel import mine_cells, iter_mined_cells, get_cell_sizes
+from condensed import get_maximal_itemsets
+from stats import STATS, instrument
+
+def get_equivalence_classes(tid_bitsets, min_support):
+  # the frequent pairs of a cell as (itemset, diffset, support), one list
+  # per first item, the diffset d(XY) = t(X) - t(Y) being the tids of X
+  # without Y
+  items = []
+  for item in sorted(tid_bitsets):
+    support = tid_bitsets[item].bit_count()
+    if support >= min_support:
+      items.append((item, tid_bitsets[item], support))
+  classes = []
+  for index, (item, bits, support) in enumerate(items):
+    pairs = []
+    for other, other_bits, other_support in items[index+1:]:
+      diffset = bits & ~other_bits
+      pair_support = support - diffset.bit_count()
+      if pair_support >= min_support:
+        pairs.append(((item, other), diffset, pair_support))
+    if len(pairs) > 0:
+      classes.append(pairs)
+  STATS.count('diffsets', len(items) * (len(items)-1) // 2)
+  return classes
+
+def mine_equivalence_class(itemsets, min_support, frequent_itemsets):
+  """
+  dEclat on itemsets sharing a prefix: PX and PY join into PXY with
+  d(PXY) = d(PY) - d(PX) and support(PXY) = support(PX) - |d(PXY)|.
+  """
+  for index, (itemset, diffset, support) in enumerate(itemsets):
+    frequent_itemsets.append((itemset, support))
+    next_itemsets = []
+    for other, other_diffset, other_support in itemsets[index+1:]:
+      next_diffset = other_diffset & ~diffset
+      next_support = support - next_diffset.bit_count()
+      if next_support >= min_support:
+        next_itemsets.append((itemset + other[-1:], next_diffset, next_support))
+    STATS.count('diffsets', len(itemsets) - index - 1)
+    if len(next_itemsets) > 0:
+      mine_equivalence_class(next_itemsets, min_support, frequent_itemsets)
+
+def charm_extend(prefix, itemsets, min_support, closed):
+  """
+  CHARM on itemsets sharing prefix, as [items, tids, support] with the
+  items added to prefix. When t(X) is within t(Y), Y is in the closure of
+  X and joins X instead of opening a branch; when t(Y) is within t(X), Y
+  only grows under X. closed maps every tid-set found to its itemset.
+  """
+  index = 0
+  while index < len(itemsets):
+    items, bits, support = itemsets[index]
+    items = set(items)
+    next_itemsets = []
+    other_index = index + 1
+    while other_index < len(itemsets):
+      other_items, other_bits, other_support = itemsets[other_index]
+      next_bits = bits & other_bits
+      next_support = next_bits.bit_count()
+      if next_support < min_support:
+        other_index += 1
+        continue
+      if next_bits == bits:
+        items.update(other_items)
+        if next_bits == other_bits:
+          del itemsets[other_index]
+          continue
+      elif next_bits == other_bits:
+        del itemsets[other_index]
+        next_itemsets.append([other_items, next_bits, next_support])
+        continue
+      else:
+        next_itemsets.append([other_items, next_bits, next_support])
+      other_index += 1
+    STATS.count('tidsets', len(itemsets) - index - 1)
+    itemset = prefix | items
+    if len(next_itemsets) > 0:
+      next_itemsets.sort(key=lambda x: x[2])
+      charm_extend(itemset, next_itemsets, min_support, closed)
+    # an itemset with the tid-set of one found before is within its closure
+    if bits in closed:
+      closed[bits].update(itemset)
+    else:
+      closed[bits] = set(itemset)
+    index += 1
+
+def get_closed_itemsets_of_cell(tid_bitsets, min_support):
+  # closed itemsets of a cell, the frequent items in increasing support
+  items = []
+  for item in sorted(tid_bitsets):
+    bits = tid_bitsets[item]
+    support = bits.bit_count()
+    if support >= min_support:
+      items.append([(item,), bits, support])
+  items.sort(key=lambda x: x[2])
+  closed = {}
+  charm_extend(set(), items, min_support, closed)
+  return [(tuple(sorted(itemset)), bits.bit_count()) for bits, itemset in closed.items() if len(itemset) > 1]
+
+def get_frequent_itemsets_of_cell(tid_bitsets, min_support, itemsets='all'):
+  # all, closed or maximal itemsets of two or more items, as (itemset, count);
+  # the maximal itemsets are the closed ones without a closed superset
+  if itemsets == 'closed':
+    return get_closed_itemsets_of_cell(tid_bitsets, min_support)
+  if itemsets == 'maximal':
+    return get_maximal_itemsets(get_closed_itemsets_of_cell(tid_bitsets, min_support))
+  frequent_itemsets = []
+  for pairs in get_equivalence_classes(tid_bitsets, min_support):
+    mine_equivalence_class(pairs, min_support, frequent_itemsets)
+  return frequent_itemsets
+
+def get_final_itemsets(tid_bitsets_by_cell, min_support, workers=1, itemsets='all'):
+  # eclat on every cell, as (itemset, count, cell) of two or more items
+  sizes = get_cell_sizes(tid_bitsets_by_cell, get_tid_bitsets_size)
+  mine_cell = partial(get_frequent_itemsets_of_cell, min_support=min_support, itemsets=itemsets)
+  frequent_itemsets_by_cell = mine_cells(mine_cell, tid_bitsets_by_cell, workers, sizes)
+  final_itemsets = []
+  for cell, frequent_itemsets in frequent_itemsets_by_cell.items():
+    final_itemsets.extend([(itemset, count, cell) for itemset, count in frequent_itemsets])
+  return final_itemsets
+
+def get_cell_tid_bitsets(store):
+  # tid bitsets of the (location, time) cells of a TransactionStore, and
+  # of the star cells rolled up from the child cell tid-sets
+  location_time_star_items = get_star_items_of_location_times(store.cells)
+  tid_bitsets = get_vertical_layout_by_cell(store)[0]
+  return [tid_bitsets, rollup_cells(tid_bitsets, get_star_cells(location_time_star_items), merge_tid_bitsets)]
+
+def mine_store(store, min_support, workers=1, itemsets='all'):
+  # zero, one and two star itemsets of a TransactionStore, as item ids;
+  # itemsets is all, closed (CHARM) or maximal
+  check_min_support(min_support)
+  tid_bitsets, star_tid_bitsets = get_cell_tid_bitsets(store)
+  final_itemsets = get_final_itemsets(tid_bitsets, min_support, workers, itemsets)
+  star_final_itemsets = get_final_itemsets(star_tid_bitsets, min_support, workers, itemsets)
+  return get_star_itemsets(final_itemsets, star_final_itemsets)
+
+def iter_store_cells(store, min_support, workers=1, itemsets='all'):
+  # (cell, [(itemset, count)]) of every (location, time) and star cell,
+  # each yielded as soon as it is mined
+  check_min_support(min_support)
+  mine_cell = partial(get_frequent_itemsets_of_cell, min_support=min_support, itemsets=itemsets)
+  for tid_bitsets_by_cell in get_cell_tid_bitsets(store):
+    sizes = get_cell_sizes(tid_bitsets_by_cell, get_tid_bitsets_size)
+    for cell, cell_itemsets in iter_mined_cells(mine_cell, tid_bitsets_by_cell, workers, sizes):
+      yield cell, cell_itemsets
+
+def main():
+  config_data = get_config_info()
+  MIN_SUPPORT_VALUE = int(config_data['min_support'])
+  workers = int(config_data.get('workers', 1))
+  itemsets = config_data.get('itemsets', 'all')
+  # timed end to end, preprocessing included
+  t1 = datetime.datetime.now()
+  with instrument(config_data.get('stats_file'), config_data.get('profile_file')):
+    store = load_store(config_data)
+    star_itemsets = mine_store(store, MIN_SUPPORT_VALUE, workers, itemsets)
+  zero_star_itemsets = star_itemsets[0]
+  one_star_itemsets = star_itemsets[1]
+  two_star_itemsets = star_itemsets[2]
+  t2 = datetime.datetime.now()
+  total_time = t2-t1
+  print(20*'*')
+  print('Total time taken in (seconds) by eclat algorithm:', total_time.total_seconds())
+  print('Min support value:', MIN_SUPPORT_VALUE)
+  if itemsets != 'all':
+    print('Itemsets:', itemsets)
+  print(20*'*')
+  print_table(decode_itemsets(store, zero_star_itemsets), 'Itemsets for CMB')
+  print_table(decode_itemsets(store, one_star_itemsets), 'Itemsets for 1 star CMP')
+  print_table(decode_itemsets(store, two_star_itemsets), 'Itemsets for 2 star')
+
+if '__main__' == __name__:
+  main()
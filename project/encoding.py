@@ -0,0 +1,110 @@
+from array import array
+import numpy as np
+from preprocess import iter_preprocessed_data, get_bin_edges, DEFAULT_SETTINGS
+from stats import STATS
+
+def get_item_key(item):
+  # total order on item names: level of the bin first, then the name;
+  # names that are not a 3 character prefix and a bin, such as those of
+  # transactions given to mine() directly, come after by name
+  if item[3:].isdigit():
+    return (0, int(item[3:]), item)
+  return (1, 0, item)
+
+class TransactionStore(object):
+  """
+  Dictionary encoded transactions in CSR layout, grouped by cell.
+
+  items[i] is the name of item id i, ids follow get_item_key order.
+  cells[c] is the (location, time) of cell id c.
+  The item ids of transaction t are item_ids[offsets[t]:offsets[t+1]]
+  and the transactions of cell c are cell_offsets[c]:cell_offsets[c+1].
+  bin_edges are the inner bin edges the items were discretised with and
+  location_parents the spatial hierarchy of the file, as built by
+  preprocess.update_location_parents.
+  """
+  def __init__(self, items, cells, offsets, item_ids, cell_offsets, bin_edges=None, location_parents=None):
+    self.items = items
+    self.cells = cells
+    self.offsets = offsets
+    self.item_ids = item_ids
+    self.cell_offsets = cell_offsets
+    self.bin_edges = bin_edges
+    self.location_parents = location_parents
+
+  def __len__(self):
+    return len(self.offsets) - 1
+
+  def get_cell_size(self, cell_id):
+    return int(self.cell_offsets[cell_id+1] - self.cell_offsets[cell_id])
+
+  def get_cell_transactions(self, cell_id):
+    # row of every item id of the cell, relative to the first transaction
+    start, end = self.cell_offsets[cell_id], self.cell_offsets[cell_id+1]
+    lengths = np.diff(self.offsets[start:end+1])
+    rows = np.repeat(np.arange(end-start), lengths)
+    return rows, self.item_ids[self.offsets[start]:self.offsets[end]]
+
+  def decode_itemset(self, itemset):
+    return tuple(self.items[item] for item in itemset)
+
+
+def encode_transactions(chunks):
+  """
+  Build a TransactionStore from an iterable of lists of
+  [items, location, time] transactions.
+  """
+  item_index = {}
+  cell_index = {}
+  lengths = array('q')
+  item_ids = array('q')
+  cell_ids = array('q')
+  for chunk in chunks:
+    for transaction in chunk:
+      for item in transaction[0]:
+        if not item in item_index:
+          item_index[item] = len(item_index)
+        item_ids.append(item_index[item])
+      lengths.append(len(transaction[0]))
+      cell = (transaction[1], transaction[2])
+      if not cell in cell_index:
+        cell_index[cell] = len(cell_index)
+      cell_ids.append(cell_index[cell])
+  # renumber the items so that id order is item order
+  items = sorted(item_index, key=get_item_key)
+  renumber = np.zeros(len(items), dtype=np.int32)
+  for item_id, item in enumerate(items):
+    renumber[item_index[item]] = item_id
+  item_ids = renumber[np.frombuffer(item_ids, dtype=np.int64)]
+  lengths = np.frombuffer(lengths, dtype=np.int64)
+  cell_ids = np.frombuffer(cell_ids, dtype=np.int64)
+  offsets = np.zeros(len(lengths)+1, dtype=np.int64)
+  np.cumsum(lengths, out=offsets[1:])
+  # group the transactions by cell, keeping their order inside a cell
+  order = np.argsort(cell_ids, kind='stable')
+  grouped_lengths = lengths[order]
+  grouped_offsets = np.zeros(len(lengths)+1, dtype=np.int64)
+  np.cumsum(grouped_lengths, out=grouped_offsets[1:])
+  positions = np.repeat(offsets[:-1][order] - grouped_offsets[:-1], grouped_lengths) + np.arange(grouped_offsets[-1])
+  grouped_item_ids = item_ids[positions]
+  cell_offsets = np.zeros(len(cell_index)+1, dtype=np.int64)
+  np.cumsum(np.bincount(cell_ids, minlength=len(cell_index)), out=cell_offsets[1:])
+  return TransactionStore(items, list(cell_index), grouped_offsets, grouped_item_ids, cell_offsets)
+
+def get_transaction_store(filename, chunk_size=10000, settings=DEFAULT_SETTINGS):
+  with STATS.phase('preprocessing'):
+    bin_edges = get_bin_edges(filename, settings, chunk_size)
+    location_parents = {}
+    store = encode_transactions(iter_preprocessed_data(filename, chunk_size, settings, bin_edges, location_parents=location_parents))
+    store.bin_edges = bin_edges
+    store.location_parents = location_parents
+  STATS.count('transactions', len(store))
+  return store
+
+
+def decode_itemsets(store, itemsets_by_cell):
+  # replace the item ids of the (itemset, count, ...) tuples by item names
+  decoded = {}
+  for cell, itemsets in itemsets_by_cell.items():
+    decoded[cell] = [(store.decode_itemset(itemset[0]),) + tuple(itemset[1:]) for itemset in itemsets]
+  return decoded
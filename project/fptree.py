@@ -1,61 +1,78 @@
 import itertools
-import pandas as pd
-import numpy as np
+import heapq
 import functools
 import csv
 import datetime
-from preprocess import get_preprocessed_data
-from prettytable import PrettyTable
-from utils import print_table, get_location_time_star_items, combine_same_itemsets_count, get_config_info
+from encoding import decode_itemsets
+from cache import load_store
+from support import get_one_hot, get_transaction_counts, check_min_support
+from utils import print_table, get_star_items_of_location_times, get_config_info
+from cube import get_star_cells, rollup_cells, merge_counts, get_star_itemsets
+from parallel import mine_cells, iter_mined_cells, get_cell_sizes
+from stats import STATS, instrument
+from condensed import get_maximal_itemsets, get_unsubsumed_itemsets, filter_star_itemsets
+
+def count_nodes(headers):
+    """
+    Number of nodes of a tree, following the header chains.
+    """
+    nodes = 0
+    for node in headers.values():
+        while node is not None:
+            nodes += 1
+            node = node.link
+    return nodes
+
 
 class FPNode(object):
+    __slots__ = ('value', 'count', 'parent', 'link', 'children')
+
     def __init__(self, value, count, parent):
         self.value = value
         self.count = count
         self.parent = parent
         self.link = None
-        self.children = []
+        self.children = {}
 
     def has_child(self, value):
-
-        for node in self.children:
-            if node.value == value:
-                return True
-
-        return False
+        return value in self.children
 
     def get_child(self, value):
-  
-        for node in self.children:
-            if node.value == value:
-                return node
+        return self.children.get(value)
 
-        return None
-
-    def add_child(self, value):
-        child = FPNode(value, 1, self)
-        self.children.append(child)
+    def add_child(self, value, count=1):
+        child = FPNode(value, count, self)
+        self.children[value] = child
         return child
 
 
 class FPTree(object):
+    """
+    FP tree over weighted transactions, a list of
+    (items, count) pairs.
+    """
     def __init__(self, transactions, threshold, root_value, root_count):
-        self.frequent = self.find_frequent_items(transactions, threshold)
-        self.headers = self.build_header_table(self.frequent)
-        self.root = self.build_fptree(
-            transactions, root_value,
-            root_count, self.frequent, self.headers)
+        with STATS.phase('fptree_construction'):
+            self.frequent = self.find_frequent_items(transactions, threshold)
+            self.headers = self.build_header_table(self.frequent)
+            self.tails = self.build_header_table(self.frequent)
+            self.root = self.build_fptree(
+                transactions, root_value,
+                root_count, self.frequent, self.headers)
+        if STATS.enabled:
+            STATS.count('fp_trees' if root_value is None else 'fp_conditional_trees')
+            STATS.count('fp_nodes', count_nodes(self.headers))
 
     @staticmethod
     def find_frequent_items(transactions, threshold):
         items = {}
 
-        for transaction in transactions:
+        for transaction, count in transactions:
             for item in transaction:
                 if item in items:
-                    items[item] += 1
+                    items[item] += count
                 else:
-                    items[item] = 1
+                    items[item] = count
 
         for key in list(items.keys()):
             if items[key] < threshold:
@@ -75,51 +92,62 @@ class FPTree(object):
                      root_count, frequent, headers):
         root = FPNode(root_value, root_count, None)
 
-        for transaction in transactions:
+        for transaction, count in transactions:
             sorted_items = [x for x in transaction if x in frequent]
-            sorted_items.sort(key=lambda x: frequent[x], reverse=True)
+            # Break frequency ties on the item so every transaction
+            # follows the same global order.
+            sorted_items.sort(key=lambda x: (frequent[x], x), reverse=True)
             if len(sorted_items) > 0:
-                self.insert_tree(sorted_items, root, headers)
+                self.insert_tree(sorted_items, root, headers, count)
 
         return root
 
-    def insert_tree(self, items, node, headers):
-        first = items[0]
-        child = node.get_child(first)
-        if child is not None:
-            child.count += 1
-        else:
-            # Add new child.
-            child = node.add_child(first)
-
-            # Link it to header structure.
-            if headers[first] is None:
-                headers[first] = child
+    def insert_tree(self, items, node, headers, count=1):
+        for item in items:
+            child = node.children.get(item)
+            if child is not None:
+                child.count += count
             else:
-                current = headers[first]
-                while current.link is not None:
-                    current = current.link
-                current.link = child
-
-        # Call function recursively.
-        remaining_items = items[1:]
-        if len(remaining_items) > 0:
-            self.insert_tree(remaining_items, child, headers)
+                # Add new child and link it to the tail of the header chain.
+                child = node.add_child(item, count)
+                if headers[item] is None:
+                    headers[item] = child
+                else:
+                    self.tails[item].link = child
+                self.tails[item] = child
+            node = child
 
     def tree_has_single_path(self, node):
-        num_children = len(node.children)
-        if num_children > 1:
-            return False
-        elif num_children == 0:
-            return True
-        else:
-            return True and self.tree_has_single_path(node.children[0])
+        while len(node.children) == 1:
+            node = next(iter(node.children.values()))
+        return len(node.children) == 0
+
+    def prefix_paths(self, item):
+        """
+        The conditional pattern base of item, as (path, count) pairs.
+        """
+        paths = []
+        node = self.headers[item]
+        while node is not None:
+            path = []
+            parent = node.parent
+            while parent.parent is not None:
+                path.append(parent.value)
+                parent = parent.parent
+            if len(path) > 0:
+                paths.append((path, node.count))
+            node = node.link
+        return paths
 
     def mine_patterns(self, threshold):
         if self.tree_has_single_path(self.root):
             return self.generate_pattern_list()
         else:
-            return self.zip_patterns(self.mine_sub_trees(threshold))
+            patterns = self.zip_patterns(self.mine_sub_trees(threshold))
+            if self.root.value is not None:
+                # The suffix on its own is frequent in a conditional tree.
+                patterns[(self.root.value,)] = self.root.count
+            return patterns
 
     def zip_patterns(self, patterns):
         """
@@ -186,8 +214,7 @@ class FPTree(object):
                     path.append(parent.value)
                     parent = parent.parent
 
-                for i in range(frequency):
-                    conditional_tree_input.append(path)
+                conditional_tree_input.append((path, frequency))
 
             # Now we have the input for a subtree,
             # so construct it and grab the patterns.
@@ -205,7 +232,113 @@ class FPTree(object):
         return patterns
 
 
+class CellFPTree(object):
+    """
+    FP tree shared by all (location, time) cells. Transactions are
+    (items, counts) pairs and every node count is a {cell: count} vector,
+    so one tree and one traversal mine every cell at once.
+    """
+    def __init__(self, transactions, threshold, suffix=()):
+        with STATS.phase('fptree_construction'):
+            self.frequent = self.find_frequent_items(transactions, threshold)
+            self.totals = {}
+            for item, counts in self.frequent.items():
+                self.totals[item] = sum(counts.values())
+            self.headers = FPTree.build_header_table(self.frequent)
+            self.tails = FPTree.build_header_table(self.frequent)
+            self.root = self.build_fptree(transactions)
+        if STATS.enabled:
+            STATS.count('fp_trees' if len(suffix) == 0 else 'fp_conditional_trees')
+            STATS.count('fp_nodes', count_nodes(self.headers))
+
+    @staticmethod
+    def find_frequent_items(transactions, threshold):
+        items = {}
+
+        for transaction, counts in transactions:
+            for item in transaction:
+                if not item in items:
+                    items[item] = {}
+                item_counts = items[item]
+                for cell, count in counts.items():
+                    item_counts[cell] = item_counts.get(cell, 0) + count
+
+        # An item stays if it is frequent in at least one cell.
+        for key in list(items.keys()):
+            if max(items[key].values()) < threshold:
+                del items[key]
+
+        return items
+
+    def build_fptree(self, transactions):
+        root = FPNode(None, {}, None)
+
+        for transaction, counts in transactions:
+            sorted_items = [x for x in transaction if x in self.frequent]
+            sorted_items.sort(key=lambda x: (self.totals[x], x), reverse=True)
+            if len(sorted_items) > 0:
+                self.insert_tree(sorted_items, root, counts)
+
+        return root
+
+    def insert_tree(self, items, node, counts):
+        for item in items:
+            child = node.children.get(item)
+            if child is None:
+                child = node.add_child(item, {})
+                if self.headers[item] is None:
+                    self.headers[item] = child
+                else:
+                    self.tails[item].link = child
+                self.tails[item] = child
+            for cell, count in counts.items():
+                child.count[cell] = child.count.get(cell, 0) + count
+            node = child
+
+    def mine_patterns(self, threshold, suffix=()):
+        """
+        Return {pattern: {cell: count}} holding, for every pattern,
+        only the cells it is frequent in.
+        """
+        patterns = {}
+        mining_order = sorted(self.frequent.keys(),
+                              key=lambda x: (self.totals[x], x))
+
+        for item in mining_order:
+            pattern = (item,) + suffix
+            cell_counts = {}
+            for cell, count in self.frequent[item].items():
+                if count >= threshold:
+                    cell_counts[cell] = count
+            patterns[tuple(sorted(pattern))] = cell_counts
+
+            # Prefix paths only keep the cells the pattern is frequent
+            # in, since no superset can be frequent anywhere else.
+            conditional_tree_input = []
+            node = self.headers[item]
+            while node is not None:
+                path_counts = {}
+                for cell, count in node.count.items():
+                    if cell in cell_counts:
+                        path_counts[cell] = count
+                path = []
+                parent = node.parent
+                while parent.parent is not None:
+                    path.append(parent.value)
+                    parent = parent.parent
+                if len(path) > 0 and len(path_counts) > 0:
+                    conditional_tree_input.append((path, path_counts))
+                node = node.link
+
+            if len(conditional_tree_input) > 0:
+                subtree = CellFPTree(conditional_tree_input, threshold, pattern)
+                patterns.update(subtree.mine_patterns(threshold, pattern))
+
+        return patterns
+
+
 def find_frequent_patterns(transactions, support_threshold):
+    transactions = [(transaction, 1) for transaction in transactions]
     tree = FPTree(transactions, support_threshold, None, None)
     return tree.mine_patterns(support_threshold)
 
@@ -214,7 +347,8 @@ def generate_association_rules(patterns, confidence_threshold):
     """
     Given a set of frequent itemsets, return a dict
     of association rules in the form
-    {(left): ((right), confidence)}
+    {(left): [((right), confidence)]}
+    rules.py generates them per cell with ap-genrules.
     """
     rules = {}
     for itemset in patterns.keys():
@@ -230,7 +364,10 @@ def generate_association_rules(patterns, confidence_threshold):
                     confidence = float(upper_support) / lower_support
 
                     if confidence >= confidence_threshold:
-                        rules[antecedent] = (consequent, confidence)
+                        if antecedent in rules:
+                            rules[antecedent].append((consequent, confidence))
+                        else:
+                            rules[antecedent] = [(consequent, confidence)]
 
     return rules
 
@@ -259,87 +396,284 @@ def get_transaction_from_file(num):
 
 	return transaction
 
-def find_frequent_patterns_by_location_time(transactions, support_value):
-    transactions_by_location_time = {}
-    for transaction in transactions:
-        id = (transaction[1], transaction[2])
-        if id in transactions_by_location_time:
-            transactions_by_location_time[id].append(transaction[0])
-        else:
-            transactions_by_location_time[id] = [transaction[0]]
+def get_transaction_counts_by_location_time(store):
+    transaction_counts_by_location_time = {}
+    with STATS.phase('transaction_counts'):
+        for cell_id, location_time in enumerate(store.cells):
+            transaction_counts_by_location_time[location_time] = get_transaction_counts(get_one_hot(store, cell_id))
+    return transaction_counts_by_location_time
+
+
+def mine_closed(tree, threshold, closed, head=(), head_support=None):
+    """
+    FPClose-style pattern growth. The items of a conditional tree as
+    frequent as its head are in the closure of the head, so they join the
+    head instead of being grown one by one. Every head reached is added to
+    closed as a candidate; one missing part of its closure, an item ordered
+    below it in the tree, is subsumed by a candidate found from that item.
+    """
+    closure = set()
+    if len(head) > 0:
+        for item, support in tree.frequent.items():
+            if support == head_support:
+                closure.add(item)
+        head = head + tuple(closure.difference(head))
+        closed.append((tuple(sorted(head)), head_support))
+    mining_order = sorted(tree.frequent.keys(),
+                          key=lambda x: (tree.frequent[x], x))
+    for item in mining_order:
+        if item in closure:
+            continue
+        support = tree.frequent[item]
+        conditional_tree_input = tree.prefix_paths(item)
+        subtree = FPTree(conditional_tree_input, threshold, item, support)
+        mine_closed(subtree, threshold, closed, head + (item,), support)
+
+
+def mine_maximal(tree, threshold, maximal, head=()):
+    """
+    FPMax-style pattern growth into maximal, {itemset: support}. A head
+    whose union with all frequent items of its conditional tree is within
+    a maximal itemset found before is not grown, and a single path tree
+    gives one maximal candidate, the head and the whole path.
+    """
+    head_tail = frozenset(head).union(tree.frequent)
+    for itemset in maximal:
+        if head_tail <= itemset:
+            return
+    if tree.tree_has_single_path(tree.root):
+        node = tree.root
+        while len(node.children) > 0:
+            node = next(iter(node.children.values()))
+        if node.parent is not None:
+            maximal[head_tail] = node.count
+        return
+    mining_order = sorted(tree.frequent.keys(),
+                          key=lambda x: (tree.frequent[x], x))
+    for item in mining_order:
+        support = tree.frequent[item]
+        pattern = head + (item,)
+        subtree = FPTree(tree.prefix_paths(item), threshold, item, support)
+        if len(subtree.frequent) > 0:
+            mine_maximal(subtree, threshold, maximal, pattern)
+        elif not any(frozenset(pattern) <= itemset for itemset in maximal):
+            maximal[frozenset(pattern)] = support
+
+
+def find_frequent_patterns_of_cell(transaction_counts, support_value, itemsets='all'):
+    tree = FPTree(list(transaction_counts.items()), support_value, None, None)
+    if itemsets == 'closed':
+        closed = []
+        mine_closed(tree, support_value, closed)
+        frequent_itemsets = get_unsubsumed_itemsets(closed)
+    elif itemsets == 'maximal':
+        maximal = {}
+        mine_maximal(tree, support_value, maximal)
+        frequent_itemsets = get_maximal_itemsets([(tuple(sorted(id)), count) for id, count in maximal.items()])
+    else:
+        frequent_itemsets = tree.mine_patterns(support_value).items()
+    return [(id, count) for id, count in frequent_itemsets if len(id) > 1]
+
+
+def get_transaction_count(transaction_counts):
+    return sum(transaction_counts.values())
+
+
+def get_cell_miner(support_value, top_k=None, itemsets='all'):
+    # what mines the distinct transaction counts of one cell: its top_k
+    # itemsets, or all, closed or maximal ones of support_value
+    if top_k is not None:
+        if top_k < 1:
+            raise ValueError('top_k must be at least 1')
+        if itemsets != 'all':
+            raise ValueError('top_k cannot be combined with closed or maximal itemsets')
+        return functools.partial(find_top_k_patterns_of_cell, k=top_k)
+    return functools.partial(find_frequent_patterns_of_cell, support_value=support_value, itemsets=itemsets)
+
+
+def find_patterns_by_cell(mine_cell, transaction_counts_by_cell, workers=1):
+    sizes = get_cell_sizes(transaction_counts_by_cell, get_transaction_count)
+    itemsets_by_cell = mine_cells(mine_cell, transaction_counts_by_cell, workers, sizes)
     final_itemsets = []
-    for location_time, transactions in transactions_by_location_time.items():
-        frequent_itemsets = find_frequent_patterns(transactions, support_value)
-        frequent_itemsets = [(id, count, location_time) for id, count in frequent_itemsets.items() if len(id) > 1]
-        if len(frequent_itemsets) > 0:
-            final_itemsets.append(frequent_itemsets)
-    final_itemsets = list(itertools.chain.from_iterable(final_itemsets))
+    for cell, cell_itemsets in itemsets_by_cell.items():
+        final_itemsets.extend([(id, count, cell) for id, count in cell_itemsets])
     return final_itemsets
 
 
-def get_star_itemsets(final_itemsets, location_time_star_items):
-  one_star_location = location_time_star_items[0]
-  one_star_time = location_time_star_items[1]
-  zero_star_itemsets = {}
-  one_star_itemsets = {}
-  two_star_itemsets = {}
-  for itemset in final_itemsets:
-    if itemset[2] in zero_star_itemsets:
-      zero_star_itemsets[itemset[2]].append(itemset)
-    else:
-      zero_star_itemsets[itemset[2]] = [itemset]
-  for location in one_star_location:
-    for id, itemsets in zero_star_itemsets.items():
-      if location == id[0]:
-        new_id = (location, '*')
-        if new_id in one_star_itemsets:
-          one_star_itemsets[new_id].append(itemsets)
-        else:
-          one_star_itemsets[new_id] = [itemsets]
-  for time in one_star_time:
-    for id, itemsets in zero_star_itemsets.items():
-      if time == id[1]:
-        new_id = ('*', time)
-        if new_id in one_star_itemsets:
-          one_star_itemsets[new_id].append(itemsets)
-        else:
-          one_star_itemsets[new_id] = [itemsets]
-  # concatenate the list of list to form single list of itemsets
-  for id, itemsets in one_star_itemsets.items():
-    one_star_itemsets[id] = list(itertools.chain.from_iterable(one_star_itemsets[id]))
-  two_star_id = ('*', '*')
-  two_star_itemsets[two_star_id] = []
-  for id, itemsets in zero_star_itemsets.items():
-    two_star_itemsets[two_star_id].append(itemsets)
-  two_star_itemsets[two_star_id] = list(itertools.chain.from_iterable(two_star_itemsets[two_star_id]))
-  for id, itemsets in one_star_itemsets.items():
-    one_star_itemsets[id] = combine_same_itemsets_count(itemsets)
-  for id, itemsets in two_star_itemsets.items():
-    two_star_itemsets[id] = combine_same_itemsets_count(itemsets)
-  return [zero_star_itemsets, one_star_itemsets, two_star_itemsets]
+def find_frequent_patterns_by_cell(transaction_counts_by_cell, support_value, workers=1, itemsets='all'):
+    return find_patterns_by_cell(get_cell_miner(support_value, None, itemsets), transaction_counts_by_cell, workers)
+
+
+def get_cell_transaction_counts(store):
+    """
+    Distinct transaction counts of the (location, time) cells of a
+    TransactionStore, and of the star cells merged bottom-up from them
+    along the location/time lattice.
+    """
+    transaction_counts = get_transaction_counts_by_location_time(store)
+    location_time_star_items = get_star_items_of_location_times(transaction_counts)
+    star_transaction_counts = rollup_cells(transaction_counts, get_star_cells(location_time_star_items), merge_counts)
+    return [transaction_counts, star_transaction_counts]
+
+
+class TopK(object):
+    """
+    The k highest supports seen so far, and every pattern of two or more
+    items reaching the k-th of them. Ties with the k-th support are kept.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.supports = []
+        self.patterns = {}
+
+    def threshold(self):
+        if len(self.supports) < self.k:
+            return 1
+        return self.supports[0]
+
+    def add(self, pattern, support):
+        if support < self.threshold():
+            return
+        self.patterns[pattern] = support
+        if len(self.supports) < self.k:
+            heapq.heappush(self.supports, support)
+        elif support > self.supports[0]:
+            heapq.heapreplace(self.supports, support)
+
+    def get_patterns(self):
+        threshold = self.threshold()
+        patterns = [(pattern, support) for pattern, support in self.patterns.items() if support >= threshold]
+        patterns.sort(key=lambda x: (-x[1], x[0]))
+        return patterns
+
 
+def mine_top_k(tree, top_k, suffix=()):
+    """
+    Pattern growth collecting into top_k. Items are grown most frequent
+    first, and every conditional tree is built with the threshold top_k
+    has reached by then, so the search narrows as the heap fills.
+    """
+    mining_order = sorted(tree.frequent.keys(),
+                          key=lambda x: (tree.frequent[x], x), reverse=True)
+    for item in mining_order:
+        support = tree.frequent[item]
+        if support < top_k.threshold():
+            # items are in decreasing support, none of the rest can qualify
+            break
+        pattern = tuple(sorted((item,) + suffix))
+        if len(pattern) > 1:
+            top_k.add(pattern, support)
+
+        conditional_tree_input = tree.prefix_paths(item)
+        if len(conditional_tree_input) > 0:
+            subtree = FPTree(conditional_tree_input, top_k.threshold(), item, support)
+            if len(subtree.frequent) > 0:
+                mine_top_k(subtree, top_k, pattern)
+
+
+def find_top_k_patterns_of_cell(transaction_counts, k):
+    top_k = TopK(k)
+    tree = FPTree(list(transaction_counts.items()), 1, None, None)
+    mine_top_k(tree, top_k)
+    return top_k.get_patterns()
+
+
+def find_frequent_patterns_by_cell_tree(transaction_counts_by_location_time, support_value, location_time_star_items):
+    """
+    Mine every (location, time) and star cell from a single CellFPTree.
+    The count vector of each distinct transaction is rolled up to its
+    star cells before insertion, so star supports are exact.
+    """
+    cell_transactions = {}
+    for cell, transaction_counts in transaction_counts_by_location_time.items():
+        for items, count in transaction_counts.items():
+            if not items in cell_transactions:
+                cell_transactions[items] = {}
+            cell_transactions[items][cell] = count
+    star_cells = get_star_cells(location_time_star_items)
+    for counts in cell_transactions.values():
+        counts.update(rollup_cells(counts, star_cells, sum))
+    tree = CellFPTree(list(cell_transactions.items()), support_value)
+    final_itemsets = []
+    star_final_itemsets = []
+    for pattern, cell_counts in tree.mine_patterns(support_value).items():
+        if len(pattern) < 2:
+            continue
+        for cell, count in cell_counts.items():
+            if cell in star_cells:
+                final_itemsets.append((pattern, count, cell))
+            else:
+                star_final_itemsets.append((pattern, count, cell))
+    return get_star_itemsets(final_itemsets, star_final_itemsets)
+
+def mine_store(store, support_value, workers=1, mode='cell', top_k=None, itemsets='all'):
+    """
+    Zero, one and two star itemsets of a TransactionStore as item ids, with
+    one tree per cell or, in multidimensional mode, one shared tree.
+    With top_k every cell keeps its top_k most frequent itemsets instead,
+    mined one tree per cell, and support_value is not used.
+    itemsets is all, closed (FPClose) or maximal (FPMax); the shared tree
+    mines all of them and keeps the closed or maximal ones afterwards.
+    """
+    if top_k is None:
+        check_min_support(support_value)
+    if mode == 'multidimensional' and top_k is None:
+        transaction_counts = get_transaction_counts_by_location_time(store)
+        location_time_star_items = get_star_items_of_location_times(transaction_counts)
+        star_itemsets = find_frequent_patterns_by_cell_tree(transaction_counts, support_value, location_time_star_items)
+        return filter_star_itemsets(star_itemsets, itemsets)
+    mine_cell = get_cell_miner(support_value, top_k, itemsets)
+    final_itemsets, star_final_itemsets = [find_patterns_by_cell(mine_cell, transaction_counts_by_cell, workers) for transaction_counts_by_cell in get_cell_transaction_counts(store)]
+    return get_star_itemsets(final_itemsets, star_final_itemsets)
+
+def iter_store_cells(store, support_value, workers=1, mode='cell', top_k=None, itemsets='all'):
+    """
+    (cell, [(itemset, count)]) of every (location, time) and star cell of
+    a TransactionStore, as mine_store finds them, each yielded as soon as
+    its tree is mined. The shared tree of multidimensional mode mines all
+    cells at once, so those only come out at the end.
+    """
+    if top_k is None:
+        check_min_support(support_value)
+    if mode == 'multidimensional' and top_k is None:
+        for itemsets_by_cell in mine_store(store, support_value, workers, mode, top_k, itemsets):
+            for cell, cell_itemsets in itemsets_by_cell.items():
+                yield cell, [(itemset[0], itemset[1]) for itemset in cell_itemsets]
+        return
+    mine_cell = get_cell_miner(support_value, top_k, itemsets)
+    for transaction_counts_by_cell in get_cell_transaction_counts(store):
+        sizes = get_cell_sizes(transaction_counts_by_cell, get_transaction_count)
+        for cell, cell_itemsets in iter_mined_cells(mine_cell, transaction_counts_by_cell, workers, sizes):
+            yield cell, cell_itemsets
 
 def main():
 	config_data = get_config_info()
 	MIN_SUPPORT_VALUE = int(config_data['min_support'])
-	filename = config_data['filename']
-	transactions = get_preprocessed_data(filename)
-	location_time_star_items = get_location_time_star_items(transactions)
+	workers = int(config_data.get('workers', 1))
+	top_k = int(config_data['top_k']) if 'top_k' in config_data else None
+	itemsets = config_data.get('itemsets', 'all')
+	# timed end to end, preprocessing included
 	t1 = datetime.datetime.now()
-	final_itemsets = find_frequent_patterns_by_location_time(transactions, MIN_SUPPORT_VALUE)
-	star_itemsets = get_star_itemsets(final_itemsets, location_time_star_items)
+	with instrument(config_data.get('stats_file'), config_data.get('profile_file')):
+		store = load_store(config_data)
+		star_itemsets = mine_store(store, MIN_SUPPORT_VALUE, workers, config_data.get('fptree_mode', 'cell'), top_k, itemsets)
 	zero_star_itemsets = star_itemsets[0]
 	one_star_itemsets = star_itemsets[1]
 	two_star_itemsets = star_itemsets[2]
 	t2 = datetime.datetime.now()
 	total_time = t2-t1
 	print(20*'*')
-	print('Total time taken in (microseconds) by fptree algorithm:', total_time.microseconds)
-	print('Min support value:', MIN_SUPPORT_VALUE)
+	print('Total time taken in (seconds) by fptree algorithm:', total_time.total_seconds())
+	if top_k is None:
+		print('Min support value:', MIN_SUPPORT_VALUE)
+	else:
+		print('Top k itemsets per cell:', top_k)
+	if itemsets != 'all':
+		print('Itemsets:', itemsets)
 	print(20*'*')
-	print_table(zero_star_itemsets, 'Itemsets for CMB')
-	print_table(one_star_itemsets, 'Itemsets for 1 star CMP')
-	print_table(two_star_itemsets, 'Itemsets for 2 star')
+	print_table(decode_itemsets(store, zero_star_itemsets), 'Itemsets for CMB')
+	print_table(decode_itemsets(store, one_star_itemsets), 'Itemsets for 1 star CMP')
+	print_table(decode_itemsets(store, two_star_itemsets), 'Itemsets for 2 star')
 
 if '__main__' == __name__:
     main()
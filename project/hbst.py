@@ -1,46 +1,37 @@
 import datetime
-from itertools import combinations, chain
-from prettytable import PrettyTable
-from pandas_ods_reader import read_ods
-from preprocess import get_preprocessed_data
-from utils import print_table, get_location_time_star_items, combine_same_itemsets_count, get_config_info
+from functools import partial
+from utils import print_table, get_star_items_of_location_times, get_config_info
+from encoding import decode_itemsets
+from cache import load_store
+from support import get_vertical_layout_by_cell, get_tid_bitsets_size, merge_tid_bitsets, get_frequent_pairs, check_min_support
+from cube import get_star_cells, rollup_cells
+from parallel import mine_cells, iter_mined_cells, get_cell_sizes
+from candidates import generate_candidates, count_candidates
+from condensed import filter_itemsets, filter_star_itemsets
+from stats import instrument
 
 MIN_SUPPORT_VALUE = 2
 
-def get_transactions(filename):
-  test_data = get_preprocessed_data(filename)
-  return test_data
-  
-def get_itemsets_by_hash_id(transactions, hash_ids):
-  itemsets_by_hash_id = {}
-  for row in transactions:
-    location_time = (row[1], row[2])
-    itemset = row[0]
-    if hash_ids[location_time] in itemsets_by_hash_id:
-      itemsets_by_hash_id[hash_ids[location_time]].append(set(itemset))
-    else:
-      itemsets = [set(itemset)]
-      itemsets_by_hash_id[hash_ids[location_time]] = itemsets
-  return itemsets_by_hash_id
+def get_by_hash_id(values_by_location_time, hash_ids):
+  values_by_hash_id = {}
+  for location_time, value in values_by_location_time.items():
+    values_by_hash_id[hash_ids[location_time]] = value
+  return values_by_hash_id
 
 
 def get_hash_ids(star_items):
   one_star_location = star_items[0]
   one_star_time = star_items[1]
   zero_star_time_location = star_items[2]
+  # dense ids: zero star cells first, then one star and the two star cell
   hash_ids = {}
-  start_id = 1
   for time_location in zero_star_time_location:
-    hash_ids[time_location] = '1' +  str(start_id)
-    start_id += 1
-  start_id = 1
+    hash_ids[time_location] = len(hash_ids)
   for location in one_star_location:
-    hash_ids[(location, '*')] = '2' + str(start_id)
-    start_id += 1
+    hash_ids[(location, '*')] = len(hash_ids)
   for time in one_star_time:
-    hash_ids[('*', time)] = '2' + str(start_id)
-    start_id += 1
-  hash_ids[('*', '*')] = 31
+    hash_ids[('*', time)] = len(hash_ids)
+  hash_ids[('*', '*')] = len(hash_ids)
   return hash_ids
 
 def get_rev_hash_ids(hash_ids):
@@ -49,103 +40,61 @@ def get_rev_hash_ids(hash_ids):
     rev_hash_ids[id] = time_location
   return rev_hash_ids
 
-def get_itemset_freq_in_transaction(items, itemsets_by_hash_id, id):
-  count = 0
-  for itemset in itemsets_by_hash_id[id]:
-    is_subset = True
-    for item in items:
-      if not item in itemset:
-        is_subset = False
-        break
-    if is_subset:
-      count += 1
-  return count
-
-
-def get_two_items_itemsets_by_hash_id(itemsets_by_hash_id):
+def get_two_items_itemsets_by_hash_id(cooccurrence_counts_by_hash_id, min_support):
   two_items_itemsets_by_hash_id = {}
-  for id, itemsets in itemsets_by_hash_id.items():
-    unique_two_itemset = set()
-    for itemset in itemsets:
-      two_itemsets = combinations(list(itemset), 2)
-      for two_itemset in two_itemsets:
-        two_itemset = sorted(list(two_itemset), key=lambda item: int(item[3:]))
-        itemset_freq_in_transaction = get_itemset_freq_in_transaction(two_itemset, itemsets_by_hash_id, id)
-        if itemset_freq_in_transaction >= MIN_SUPPORT_VALUE:
-          unique_two_itemset.add((tuple(two_itemset), itemset_freq_in_transaction))
-    if len(unique_two_itemset) > 0:
-      two_items_itemsets_by_hash_id[id] = list(unique_two_itemset)
+  for id, cooccurrence_counts in cooccurrence_counts_by_hash_id.items():
+    two_items_itemsets = get_frequent_pairs(cooccurrence_counts, min_support)
+    if len(two_items_itemsets) > 0:
+      two_items_itemsets_by_hash_id[id] = two_items_itemsets
   return two_items_itemsets_by_hash_id
 
+def get_final_itemsets_of_hash_id(cell, min_support):
+  itemsets, tid_bitsets = cell
+  final_itemsets = []
+  while len(itemsets) > 0:
+    final_itemsets.extend(itemsets)
+    candidates = generate_candidates([itemset[0] for itemset in itemsets])
+    if len(candidates) == 0:
+      break
+    supports = count_candidates(candidates, tid_bitsets)
+    itemsets = [(candidate, itemset_freq_in_transaction) for candidate, itemset_freq_in_transaction in supports.items() if itemset_freq_in_transaction >= min_support]
+  return final_itemsets
+
 
-def get_final_itemsets_by_hash_id(base_itemset, itemsets_by_hash_id):
-  next_itemset_size = 3
-  terminate = False
-  final_itemsets_by_hash_id = {}
-  # apriori algorithm on hashed spatio-temporal itemsets
-  while(not terminate):
-    terminate = True
-    for id, itemsets in base_itemset.items():
-      next_itemsets = set()
-      if len(itemsets) > 0:
-        if id in final_itemsets_by_hash_id:
-          final_itemsets_by_hash_id[id].append(itemsets)
-        else:
-          final_itemsets_by_hash_id[id] = [itemsets]
-      for i in range(len(itemsets)):
-        for j in range(i+1, len(itemsets)):
-          new_itemset = list(set(itemsets[i][0] + itemsets[j][0]))
-          new_itemset = sorted(new_itemset, key=lambda item: int(item[3:]))
-          if len(new_itemset) == next_itemset_size:
-            itemset_freq_in_transaction = get_itemset_freq_in_transaction(new_itemset, itemsets_by_hash_id, id)
-            if(itemset_freq_in_transaction >= MIN_SUPPORT_VALUE):
-              next_itemsets.add((tuple(new_itemset), itemset_freq_in_transaction))
-      if len(next_itemsets) > 0:
-        terminate = False
-      base_itemset[id] = list(next_itemsets)
-    next_itemset_size += 1
- 
-  for id, itemsets in final_itemsets_by_hash_id.items():
-    final_itemsets_by_hash_id[id] = list(chain.from_iterable(final_itemsets_by_hash_id[id]))
-  return final_itemsets_by_hash_id
+def get_hash_id_cells(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id, min_support):
+  # the frequent pairs and tid bitsets every hash id is mined from, and
+  # its size
+  cells = {}
+  for id, itemsets in get_two_items_itemsets_by_hash_id(cooccurrence_counts_by_hash_id, min_support).items():
+    cells[id] = (itemsets, tid_bitsets_by_hash_id[id])
+  return cells, get_cell_sizes(cells, lambda cell: get_tid_bitsets_size(cell[1]))
+
+def get_final_itemsets_by_hash_id(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id, min_support, workers=1):
+  # apriori algorithm on hashed spatio-temporal itemsets, one hash id at a time
+  cells, sizes = get_hash_id_cells(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id, min_support)
+  mine_hash_id = partial(get_final_itemsets_of_hash_id, min_support=min_support)
+  return mine_cells(mine_hash_id, cells, workers, sizes)
 
   
-def get_star_itemsets_by_hash_id(final_itemsets_by_hash_id, location_time_star_items, hash_ids, rev_hash_ids):
-  one_star_location = location_time_star_items[0]
-  one_star_time = location_time_star_items[1]
+def get_star_hash_ids(star_cells, hash_ids):
+  star_hash_ids = {}
+  for location_time, star_location_times in star_cells.items():
+    star_hash_ids[hash_ids[location_time]] = [hash_ids[star_location_time] for star_location_time in star_location_times]
+  return star_hash_ids
+
+def get_star_itemsets_by_hash_id(star_final_itemsets_by_hash_id, hash_ids):
   one_star_itemsets = {}
-  two_star_itemsets = {}
-  for location in one_star_location:
-    for id, itemsets in final_itemsets_by_hash_id.items():
-      if location == rev_hash_ids[id][0]:
-        new_id = hash_ids[(location, '*')]
-        if new_id in one_star_itemsets:
-          one_star_itemsets[new_id].append(itemsets)
-        else:
-          one_star_itemsets[new_id] = [itemsets]
-  for time in one_star_time:
-    for id, itemsets in final_itemsets_by_hash_id.items():
-      if time == rev_hash_ids[id][1]:
-        new_id = hash_ids[('*', time)]
-        if new_id in one_star_itemsets:
-          one_star_itemsets[new_id].append(itemsets)
-        else:
-          one_star_itemsets[new_id] = [itemsets]
-  # concatenate the list of list to form single list of itemsets
-  for id, itemsets in one_star_itemsets.items():
-    one_star_itemsets[id] = list(chain.from_iterable(one_star_itemsets[id]))
   two_star_id = hash_ids[('*', '*')]
-  two_star_itemsets[two_star_id] = []
-  for id, itemsets in final_itemsets_by_hash_id.items():
-    two_star_itemsets[two_star_id].append(itemsets)
-  two_star_itemsets[two_star_id] = list(chain.from_iterable(two_star_itemsets[two_star_id]))
-  for id, itemsets in one_star_itemsets.items():
-    one_star_itemsets[id] = combine_same_itemsets_count(itemsets)
-  for id, itemsets in two_star_itemsets.items():
-    two_star_itemsets[id] = combine_same_itemsets_count(itemsets)
+  two_star_itemsets = {two_star_id: []}
+  for id, itemsets in star_final_itemsets_by_hash_id.items():
+    if id == two_star_id:
+      two_star_itemsets[id] = itemsets
+    else:
+      one_star_itemsets[id] = itemsets
   return [one_star_itemsets, two_star_itemsets]
 
 def print_table(itemsets_by_hash_id, rev_hash_ids, title):
+  from prettytable import PrettyTable
   print(title)
   table = PrettyTable(['ID', 'Itemsets', 'Count', 'Location', 'Time', 'Hash'])
   for index, (id, itemsets) in enumerate(itemsets_by_hash_id.items()):
@@ -157,33 +106,76 @@ def print_table(itemsets_by_hash_id, rev_hash_ids, title):
   table._max_width = {'Itemsets': 70, 'Count': 30}
   print(table)
 
+def get_hash_id_layouts(store):
+  """
+  Hash ids of the cells of a TransactionStore, and the tid bitsets and
+  co-occurrence counts by hash id of the (location, time) cells and of
+  the star cells, rolled up from the child hash id tid-sets and counts.
+  """
+  location_time_star_items = get_star_items_of_location_times(store.cells)
+  hash_ids = get_hash_ids(location_time_star_items)
+  tid_bitsets, cooccurrence_counts = get_vertical_layout_by_cell(store)
+  tid_bitsets_by_hash_id = get_by_hash_id(tid_bitsets, hash_ids)
+  cooccurrence_counts_by_hash_id = get_by_hash_id(cooccurrence_counts, hash_ids)
+  star_hash_ids = get_star_hash_ids(get_star_cells(location_time_star_items), hash_ids)
+  star_tid_bitsets_by_hash_id = rollup_cells(tid_bitsets_by_hash_id, star_hash_ids, merge_tid_bitsets)
+  star_cooccurrence_counts_by_hash_id = rollup_cells(cooccurrence_counts_by_hash_id, star_hash_ids, sum)
+  return hash_ids, [(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id), (star_tid_bitsets_by_hash_id, star_cooccurrence_counts_by_hash_id)]
+
+def mine_store(store, min_support, workers=1, itemsets='all'):
+  # zero, one and two star itemsets of a TransactionStore, as item ids,
+  # mined by hash id and keyed back by (location, time); for closed or
+  # maximal itemsets every frequent one is mined then filtered
+  check_min_support(min_support)
+  hash_ids, layouts = get_hash_id_layouts(store)
+  rev_hash_ids = get_rev_hash_ids(hash_ids)
+  # running spatio temporal apriori on the frequent pairs of every hash id
+  final_itemsets_by_hash_id, star_final_itemsets_by_hash_id = [get_final_itemsets_by_hash_id(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id, min_support, workers) for tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id in layouts]
+  star_itemsets_by_hash_id = get_star_itemsets_by_hash_id(star_final_itemsets_by_hash_id, hash_ids)
+  star_itemsets = [final_itemsets_by_hash_id] + star_itemsets_by_hash_id
+  star_itemsets = [get_by_hash_id(itemsets_by_hash_id, rev_hash_ids) for itemsets_by_hash_id in star_itemsets]
+  return filter_star_itemsets(star_itemsets, itemsets)
+
+def iter_store_cells(store, min_support, workers=1, itemsets='all'):
+  # (cell, [(itemset, count)]) of every (location, time) and star cell,
+  # each yielded as soon as its hash id is mined
+  check_min_support(min_support)
+  hash_ids, layouts = get_hash_id_layouts(store)
+  rev_hash_ids = get_rev_hash_ids(hash_ids)
+  mine_hash_id = partial(get_final_itemsets_of_hash_id, min_support=min_support)
+  for tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id in layouts:
+    cells, sizes = get_hash_id_cells(tid_bitsets_by_hash_id, cooccurrence_counts_by_hash_id, min_support)
+    for id, final_itemsets in iter_mined_cells(mine_hash_id, cells, workers, sizes):
+      yield rev_hash_ids[id], filter_itemsets(final_itemsets, itemsets)
+
 def main():
   global MIN_SUPPORT_VALUE
   # preprocessing
   config_data = get_config_info()
   MIN_SUPPORT_VALUE = int(config_data['min_support'])
-  filename = config_data['filename']
-  transactions = get_transactions(filename)
-  location_time_star_items = get_location_time_star_items(transactions)
-  hash_ids = get_hash_ids(location_time_star_items)
-  rev_hash_ids = get_rev_hash_ids(hash_ids)
-  itemsets_by_hash_id = get_itemsets_by_hash_id(transactions, hash_ids)
-  # base itemset
-  two_items_itemsets_by_hash_id = get_two_items_itemsets_by_hash_id(itemsets_by_hash_id)
-  # running spatio temporal apriori on base itemset
+  workers = int(config_data.get('workers', 1))
+  itemsets = config_data.get('itemsets', 'all')
+  # timed end to end, preprocessing included
   t1 = datetime.datetime.now()
-  final_itemsets_by_hash_id = get_final_itemsets_by_hash_id(two_items_itemsets_by_hash_id, itemsets_by_hash_id)
-  star_itemsets_by_hash_id = get_star_itemsets_by_hash_id(final_itemsets_by_hash_id, location_time_star_items, hash_ids, rev_hash_ids)
-  one_star_itemsets_by_hash_id = star_itemsets_by_hash_id[0]
-  two_star_itemsets_by_hash_id = star_itemsets_by_hash_id[1]
+  with instrument(config_data.get('stats_file'), config_data.get('profile_file')):
+    store = load_store(config_data)
+    hash_ids = get_hash_ids(get_star_items_of_location_times(store.cells))
+    rev_hash_ids = get_rev_hash_ids(hash_ids)
+    star_itemsets = mine_store(store, MIN_SUPPORT_VALUE, workers, itemsets)
+  final_itemsets_by_hash_id = get_by_hash_id(star_itemsets[0], hash_ids)
+  one_star_itemsets_by_hash_id = get_by_hash_id(star_itemsets[1], hash_ids)
+  two_star_itemsets_by_hash_id = get_by_hash_id(star_itemsets[2], hash_ids)
   t2 = datetime.datetime.now()
   total_time = t2-t1
   print(20*'*')
-  print('Total time taken in (microseconds) by Hash Based Spatio-Temporal(HBST) algorithm:', total_time.microseconds)
+  print('Total time taken in (seconds) by Hash Based Spatio-Temporal(HBST) algorithm:', total_time.total_seconds())
   print('Min support value:', MIN_SUPPORT_VALUE)
+  if itemsets != 'all':
+    print('Itemsets:', itemsets)
   print(20*'*')
-  print_table(final_itemsets_by_hash_id, rev_hash_ids, 'Itemsets for CMB')
-  print_table(one_star_itemsets_by_hash_id, rev_hash_ids, 'Itemsets for 1 star CMP')
-  print_table(two_star_itemsets_by_hash_id, rev_hash_ids, 'Itemsets for 2 star')
+  print_table(decode_itemsets(store, final_itemsets_by_hash_id), rev_hash_ids, 'Itemsets for CMB')
+  print_table(decode_itemsets(store, one_star_itemsets_by_hash_id), rev_hash_ids, 'Itemsets for 1 star CMP')
+  print_table(decode_itemsets(store, two_star_itemsets_by_hash_id), rev_hash_ids, 'Itemsets for 2 star')
 
-main()
+if '__main__' == __name__:
+  main()
@@ -0,0 +1,142 @@
+"""
+Frequent itemsets at every level of the spatial hierarchy,
+station > city > state > all, crossed with every level of the time
+hierarchy above the time_level of the transactions:
+
+  day > ISO week
+  day > month > quarter > year > all
+  month > season, month > month of year
+
+  python hierarchy.py
+  python hierarchy.py --levels state,* --levels city,quarter
+
+A dimension is a list of (level, source level, {source value: value})
+steps from its base level up. Every cell of a level is merged from the
+distinct transaction counts of the cells of its source level, so each
+level is rolled up from the one below it and no level rescans the
+transactions. The cells of every level are then mined from their counts.
+"""
+import argparse
+import datetime
+from preprocess import get_discretisation_settings, get_time_label, get_label_date, TIME_LEVELS
+from cube import rollup_cells, merge_counts
+from stats import STATS, instrument
+
+LOCATION_LEVELS = ['station', 'city', 'state', '*']
+
+# the source level every time level is rolled up from, all from year or
+# from the base level when year is not above it
+TIME_SOURCES = {'week': 'day', 'month': 'day', 'quarter': 'month', 'season': 'month', 'year': 'quarter', 'month_of_year': 'month'}
+
+def get_location_steps(location_parents, level='city'):
+  # steps of the spatial hierarchy from level up, out of the
+  # location_parents of a TransactionStore
+  if location_parents is None:
+    raise ValueError('the transaction store has no spatial hierarchy, preprocess it from a file')
+  steps = []
+  for source, target in zip(LOCATION_LEVELS, LOCATION_LEVELS[1:]):
+    if LOCATION_LEVELS.index(source) >= LOCATION_LEVELS.index(level):
+      steps.append((target, source, location_parents[target]))
+  return steps
+
+def get_time_steps(times, level='month_of_year'):
+  # steps of the time hierarchy above level, for the time labels times
+  values_by_level = {level: set(times)}
+  steps = []
+  for target in TIME_LEVELS:
+    source = TIME_SOURCES.get(target)
+    if source in values_by_level and not target in values_by_level:
+      parents = {}
+      for value in values_by_level[source]:
+        parents[value] = get_time_label(get_label_date(value, source), target)
+      steps.append((target, source, parents))
+      values_by_level[target] = set(parents.values())
+  top = 'year' if 'year' in values_by_level else level
+  steps.append(('*', top, {value: '*' for value in values_by_level[top]}))
+  return steps
+
+def rollup_dimension(values_by_cell, axis, base_level, steps, merge):
+  """
+  {level: {cell: value}} of every level of one dimension, axis 0 being
+  the location and 1 the time of a cell.
+  """
+  values_by_level = {base_level: values_by_cell}
+  for level, source, parents in steps:
+    parent_cells = {}
+    for cell in values_by_level[source]:
+      parent_cell = list(cell)
+      parent_cell[axis] = parents[cell[axis]]
+      parent_cells[cell] = [tuple(parent_cell)]
+    values_by_level[level] = rollup_cells(values_by_level[source], parent_cells, merge)
+  return values_by_level
+
+def rollup_hierarchy(values_by_cell, location_level, location_steps, time_level, time_steps, merge=merge_counts):
+  """
+  {(location level, time level): {cell: value}} of every pair of levels,
+  values_by_cell being the values of the base cells.
+  """
+  values_by_level = {}
+  by_location_level = rollup_dimension(values_by_cell, 0, location_level, location_steps, merge)
+  for level, values in by_location_level.items():
+    for level_of_time, time_values in rollup_dimension(values, 1, time_level, time_steps, merge).items():
+      values_by_level[(level, level_of_time)] = time_values
+  return values_by_level
+
+def mine_hierarchy(store, location_level, location_steps, time_level, time_steps, min_support, workers=1, itemsets='all', levels=None):
+  """
+  {(location level, time level): {(location, time): [(itemset, count)]}}
+  of every pair of levels, or of those in levels, with item names and
+  the itemsets of two or more items of a cell ordered as mine() does.
+  """
+  from fptree import get_transaction_counts_by_location_time, find_frequent_patterns_by_cell
+  transaction_counts = get_transaction_counts_by_location_time(store)
+  with STATS.phase('hierarchy_rollup'):
+    counts_by_level = rollup_hierarchy(transaction_counts, location_level, location_steps, time_level, time_steps)
+  counts_by_cell = {}
+  for level, counts in counts_by_level.items():
+    if levels is None or level in levels:
+      for cell, cell_counts in counts.items():
+        counts_by_cell[(level, cell)] = cell_counts
+  result = {}
+  for level in counts_by_level:
+    if levels is None or level in levels:
+      result[level] = {}
+  for itemset, count, (level, cell) in find_frequent_patterns_by_cell(counts_by_cell, min_support, workers, itemsets):
+    result[level].setdefault(cell, []).append((itemset, count))
+  for itemsets_by_cell in result.values():
+    for cell, cell_itemsets in itemsets_by_cell.items():
+      cell_itemsets.sort(key=lambda itemset: (len(itemset[0]), itemset[0]))
+      itemsets_by_cell[cell] = [(store.decode_itemset(itemset), count) for itemset, count in cell_itemsets]
+  return result
+
+def get_levels(value):
+  # 'state,*' -> ('state', '*')
+  return tuple(level.strip() for level in value.split(','))
+
+def main():
+  from utils import get_config_info, print_table
+  from cache import load_store
+  config_data = get_config_info()
+  parser = argparse.ArgumentParser(description='Mine the dataset of config.ini at every level of the location and time hierarchies.')
+  parser.add_argument('--min-support', type=int, default=int(config_data['min_support']))
+  parser.add_argument('--workers', type=int, default=int(config_data.get('workers', 1)))
+  parser.add_argument('--itemsets', choices=['all', 'closed', 'maximal'], default=config_data.get('itemsets', 'all'))
+  parser.add_argument('--levels', type=get_levels, action='append', help='location level,time level to mine, e.g. state,*; default every pair')
+  args = parser.parse_args()
+  settings = get_discretisation_settings(config_data)
+  t1 = datetime.datetime.now()
+  with instrument(config_data.get('stats_file'), config_data.get('profile_file')):
+    store = load_store(config_data)
+    location_steps = get_location_steps(store.location_parents, settings['location'])
+    time_steps = get_time_steps(set(time for location, time in store.cells), settings['time'])
+    result = mine_hierarchy(store, settings['location'], location_steps, settings['time'], time_steps, args.min_support, args.workers, args.itemsets, args.levels)
+  t2 = datetime.datetime.now()
+  print(20*'*')
+  print('Total time taken in (seconds) by the location and time hierarchies:', (t2-t1).total_seconds())
+  print('Min support value:', args.min_support)
+  print(20*'*')
+  for (location_level, time_level), itemsets_by_cell in result.items():
+    print_table(itemsets_by_cell, 'Itemsets for location %s, time %s' % (location_level, time_level))
+
+if '__main__' == __name__:
+  main()
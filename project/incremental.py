@@ -0,0 +1,231 @@
+import os
+import pickle
+import hashlib
+import csv
+import datetime
+from preprocess import get_discretisation_settings, get_bin_edges, iter_preprocessed_data
+from utils import print_table, get_star_items_of_location_times, get_config_info
+from encoding import get_item_key
+from support import get_weighted_tid_bitsets
+from cube import get_star_cells, rollup_cells, merge_counts
+from candidates import generate_candidates, count_candidates
+
+STATE_VERSION = 2
+TAIL_SIZE = 1 << 16
+
+def get_tail_hash(filename, offset):
+  # hash of the bytes just before offset, to notice a rewritten file
+  start = max(offset - TAIL_SIZE, 0)
+  with open(filename, 'rb') as f:
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+def get_header(filename):
+  with open(filename, newline='') as f:
+    return next(csv.reader(f))
+
+def get_new_state(filename, settings, chunk_size=10000):
+  # the bin edges are frozen at the first run so appended rows are
+  # discretised like the archive
+  return {
+    'version': STATE_VERSION,
+    'settings': settings,
+    'bin_edges': get_bin_edges(filename, settings, chunk_size),
+    'names': get_header(filename),
+    'offset': 0,
+    'tail_hash': get_tail_hash(filename, 0),
+    'min_support': None,
+    'items': [],
+    # (location, time) -> {item id tuple: count}
+    'transaction_counts': {},
+    # zero and star cells -> [frequent itemsets, negative border]
+    'itemsets': {}
+  }
+
+def load_state(path, filename, settings):
+  # a state is only reused for the same settings and a file that has
+  # been appended to since
+  if not os.path.exists(path):
+    return None
+  with open(path, 'rb') as f:
+    state = pickle.load(f)
+  if state['version'] != STATE_VERSION or state['settings'] != settings:
+    return None
+  if os.path.getsize(filename) < state['offset'] or get_tail_hash(filename, state['offset']) != state['tail_hash']:
+    return None
+  return state
+
+def save_state(state, path):
+  tmp_path = path + '.tmp'
+  with open(tmp_path, 'wb') as f:
+    pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+  os.replace(tmp_path, path)
+
+def get_delta_counts(state, filename, chunk_size=10000):
+  # distinct transaction counts per cell of the rows after state['offset'],
+  # and the offset the file was read up to
+  if os.path.getsize(filename) == state['offset']:
+    return {}, state['offset']
+  item_index = {item: item_id for item_id, item in enumerate(state['items'])}
+  delta_counts = {}
+  with open(filename, 'rb') as f:
+    names = None
+    if state['offset'] > 0:
+      f.seek(state['offset'])
+      names = state['names']
+    for chunk in iter_preprocessed_data(f, chunk_size, state['settings'], state['bin_edges'], names):
+      for items, location, time in chunk:
+        for item in items:
+          if not item in item_index:
+            item_index[item] = len(state['items'])
+            state['items'].append(item)
+        transaction = tuple(sorted(item_index[item] for item in items))
+        if not (location, time) in delta_counts:
+          delta_counts[(location, time)] = {}
+        transaction_counts = delta_counts[(location, time)]
+        transaction_counts[transaction] = transaction_counts.get(transaction, 0) + 1
+    offset = f.tell()
+  return delta_counts, offset
+
+def mine_cell(transaction_counts, item_count, min_support):
+  """
+  Level-wise apriori over the distinct transactions of a cell. Returns the
+  frequent itemsets and the negative border, the infrequent candidates,
+  both with their supports.
+  """
+  tid_bitsets = get_weighted_tid_bitsets(transaction_counts, item_count)
+  frequent = {}
+  border = {}
+  candidates = [(item,) for item in sorted(tid_bitsets)]
+  while len(candidates) > 0:
+    supports = count_candidates(candidates, tid_bitsets)
+    itemsets = []
+    for candidate in candidates:
+      support = supports.get(candidate, 0)
+      if support >= min_support:
+        frequent[candidate] = support
+        itemsets.append(candidate)
+      else:
+        border[candidate] = support
+    candidates = generate_candidates(itemsets)
+  return [frequent, border]
+
+def update_cell(itemsets, delta_counts, item_count, min_support, expired_counts=None):
+  # add the delta supports to the frequent and border itemsets, less the
+  # supports in expired_counts. As long as no border itemset becomes
+  # frequent and no frequent one infrequent the border holds, otherwise
+  # return None so the cell is mined again
+  tid_bitsets = get_weighted_tid_bitsets(delta_counts, item_count)
+  frequent = dict(itemsets[0])
+  border = dict(itemsets[1])
+  for item in tid_bitsets:
+    # items new to the cell were border itemsets of support 0
+    if not (item,) in frequent and not (item,) in border:
+      border[(item,)] = 0
+  candidates = list(frequent) + list(border)
+  supports = count_candidates(candidates, tid_bitsets)
+  if expired_counts:
+    expired_supports = count_candidates(candidates, get_weighted_tid_bitsets(expired_counts, item_count))
+    for itemset, support in expired_supports.items():
+      supports[itemset] = supports.get(itemset, 0) - support
+  for itemset in border:
+    border[itemset] += supports.get(itemset, 0)
+    if border[itemset] >= min_support:
+      return None
+  for itemset in frequent:
+    frequent[itemset] += supports.get(itemset, 0)
+    if frequent[itemset] < min_support:
+      return None
+  return [frequent, border]
+
+def update_state(state, delta_counts, min_support):
+  """
+  Merge delta_counts into the state and bring the itemsets of every cell
+  up to date. Only the cells holding new rows and the star cells above
+  them are touched. Returns the number of cells mined from scratch.
+  """
+  if state['min_support'] != min_support:
+    state['itemsets'] = {}
+    state['min_support'] = min_support
+  item_count = len(state['items'])
+  transaction_counts = state['transaction_counts']
+  for cell, counts in delta_counts.items():
+    transaction_counts[cell] = merge_counts([transaction_counts.get(cell, {}), counts])
+  star_cells = get_star_cells(get_star_items_of_location_times(transaction_counts))
+  children = {}
+  for cell, cell_star_cells in star_cells.items():
+    for star_cell in cell_star_cells:
+      if star_cell in children:
+        children[star_cell].append(cell)
+      else:
+        children[star_cell] = [cell]
+  star_delta_counts = rollup_cells(delta_counts, star_cells, merge_counts)
+  mined_cells = 0
+  for cells, deltas in [(transaction_counts, delta_counts), (children, star_delta_counts)]:
+    for cell in cells:
+      if cell in state['itemsets'] and not cell in deltas:
+        continue
+      itemsets = None
+      if cell in state['itemsets']:
+        itemsets = update_cell(state['itemsets'][cell], deltas[cell], item_count, min_support)
+      if itemsets is None:
+        if cell in transaction_counts:
+          counts = transaction_counts[cell]
+        else:
+          counts = merge_counts([transaction_counts[child] for child in children[cell]])
+        itemsets = mine_cell(counts, item_count, min_support)
+        mined_cells += 1
+      state['itemsets'][cell] = itemsets
+  return mined_cells
+
+def get_star_itemsets(state):
+  # frequent itemsets of two or more items by star level, with the item
+  # ids of the state, which follow first appearance, back to names
+  zero_star_itemsets = {}
+  one_star_itemsets = {}
+  two_star_itemsets = {('*', '*'): []}
+  for cell, (frequent, border) in state['itemsets'].items():
+    itemsets = []
+    for itemset in sorted(frequent, key=lambda itemset: (len(itemset), itemset)):
+      if len(itemset) > 1:
+        items = sorted([state['items'][item] for item in itemset], key=get_item_key)
+        itemsets.append((tuple(items), frequent[itemset]))
+    if cell == ('*', '*'):
+      two_star_itemsets[cell] = itemsets
+    elif len(itemsets) == 0:
+      continue
+    elif '*' in cell:
+      one_star_itemsets[cell] = itemsets
+    else:
+      zero_star_itemsets[cell] = itemsets
+  return [zero_star_itemsets, one_star_itemsets, two_star_itemsets]
+
+def main():
+  config_data = get_config_info()
+  MIN_SUPPORT_VALUE = int(config_data['min_support'])
+  filename = config_data['filename']
+  chunk_size = int(config_data.get('chunk_size', 10000))
+  settings = get_discretisation_settings(config_data)
+  state_file = config_data.get('state_file', 'incremental.state')
+  t1 = datetime.datetime.now()
+  state = load_state(state_file, filename, settings)
+  if state is None:
+    state = get_new_state(filename, settings, chunk_size)
+  delta_counts, state['offset'] = get_delta_counts(state, filename, chunk_size)
+  mined_cells = update_state(state, delta_counts, MIN_SUPPORT_VALUE)
+  state['tail_hash'] = get_tail_hash(filename, state['offset'])
+  save_state(state, state_file)
+  star_itemsets = get_star_itemsets(state)
+  t2 = datetime.datetime.now()
+  total_time = t2-t1
+  print(20*'*')
+  print('Total time taken in (seconds) by incremental apriori:', total_time.total_seconds())
+  print('Min support value:', MIN_SUPPORT_VALUE)
+  print('New rows:', sum(sum(counts.values()) for counts in delta_counts.values()), 'Cells mined again:', mined_cells)
+  print(20*'*')
+  print_table(star_itemsets[0], 'Itemsets for CMB')
+  print_table(star_itemsets[1], 'Itemsets for 1 star CMP')
+  print_table(star_itemsets[2], 'Itemsets for 2 star')
+
+if '__main__' == __name__:
+  main()
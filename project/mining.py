@@ -0,0 +1,180 @@
+"""
+Mining API over the apriori, hbst, fptree and eclat engines.
+
+  from mining import mine
+  result = mine(transactions, engine='fptree', min_support=3)
+
+transactions is a TransactionStore or an iterable of [items, location,
+time] transactions. The engines are imported on first use.
+
+Run as a script to load the dataset of config.ini once and mine it with
+every engine given on the command line.
+"""
+import argparse
+import datetime
+import importlib
+import os
+from cube import LEVELS
+
+ENGINES = ['apriori', 'hbst', 'fptree', 'eclat']
+
+def get_store(transactions):
+  from encoding import TransactionStore, encode_transactions
+  if isinstance(transactions, TransactionStore):
+    return transactions
+  return encode_transactions([transactions])
+
+def get_level(cell):
+  # zero_star, one_star or two_star, by the stars of a (location, time) cell
+  return LEVELS[list(cell).count('*')]
+
+def decode_cell_itemsets(store, itemsets):
+  # [(itemset, count)] of item ids to item names, ordered by size and then
+  # by items
+  itemsets = sorted((tuple(itemset[0]), itemset[1]) for itemset in itemsets)
+  itemsets.sort(key=lambda itemset: len(itemset[0]))
+  return [(store.decode_itemset(itemset), count) for itemset, count in itemsets]
+
+def iter_cells(store, star_itemsets):
+  # (level, (location, time), [(itemset, count)]) of every cell with item
+  # names
+  for level, itemsets_by_cell in zip(LEVELS, star_itemsets):
+    for cell, itemsets in itemsets_by_cell.items():
+      yield level, cell, decode_cell_itemsets(store, itemsets)
+
+def get_result(store, star_itemsets):
+  # {level: {(location, time): [(itemset, count)]}}
+  result = {level: {} for level in LEVELS}
+  for level, cell, itemsets in iter_cells(store, star_itemsets):
+    result[level][cell] = itemsets
+  return result
+
+def get_engine(engine, itemsets, top_k):
+  # the module of engine, once the arguments are checked
+  from condensed import ITEMSETS
+  if not engine in ENGINES:
+    raise ValueError('unknown engine: ' + engine)
+  if not itemsets in ITEMSETS:
+    raise ValueError('unknown itemsets: ' + itemsets)
+  if top_k is not None and engine != 'fptree':
+    raise ValueError('top_k is only supported by the fptree engine')
+  if top_k is not None and top_k < 1:
+    raise ValueError('top_k must be at least 1')
+  return importlib.import_module(engine)
+
+def mine_star_itemsets(store, engine, min_support, workers, fptree_mode, top_k, itemsets):
+  # the [zero, one, two] star itemsets of engine, as item ids
+  from stats import STATS
+  module = get_engine(engine, itemsets, top_k)
+  with STATS.phase('mining'):
+    if engine == 'apriori':
+      return module.mine_store(store, min_support, itemsets)
+    elif engine == 'hbst' or engine == 'eclat':
+      return module.mine_store(store, min_support, workers, itemsets)
+    else:
+      return module.mine_store(store, min_support, workers, fptree_mode, top_k, itemsets)
+
+def iter_store_cells(store, engine, min_support, workers, fptree_mode, top_k, itemsets):
+  # (cell, [(itemset, count)]) of engine as item ids, each cell as soon as
+  # the engine is done with it
+  module = get_engine(engine, itemsets, top_k)
+  if engine == 'apriori':
+    return module.iter_store_cells(store, min_support, itemsets)
+  elif engine == 'hbst' or engine == 'eclat':
+    return module.iter_store_cells(store, min_support, workers, itemsets)
+  else:
+    return module.iter_store_cells(store, min_support, workers, fptree_mode, top_k, itemsets)
+
+def mine(transactions, engine='apriori', min_support=2, workers=1, fptree_mode='cell', top_k=None, itemsets='all'):
+  """
+  Mine the zero, one and two star itemsets of two or more items with
+  engine. Returns {'zero_star': ..., 'one_star': ..., 'two_star': ...},
+  each {(location, time): [(itemset, count)]}. With top_k, fptree only,
+  every cell keeps its top_k most frequent itemsets instead. itemsets is
+  all, closed or maximal, the frequent itemsets without a superset of the
+  same support or without a frequent superset, per cell.
+  """
+  store = get_store(transactions)
+  return get_result(store, mine_star_itemsets(store, engine, min_support, workers, fptree_mode, top_k, itemsets))
+
+def mine_to_sink(sink, transactions, engine='apriori', min_support=2, workers=1, fptree_mode='cell', top_k=None, itemsets='all'):
+  """
+  Mine as mine() does and write every cell with itemsets to a sink of
+  sinks.py as soon as the engine has mined it, in the order the cells are
+  done, without building the result. hbst, fptree and eclat mine cell by
+  cell; apriori and the shared tree of fptree mine all cells together, so
+  theirs are written once the run is over. Returns the number of itemsets
+  written.
+  """
+  from stats import STATS
+  store = get_store(transactions)
+  written = sink.itemsets
+  with STATS.phase('mining'):
+    for cell, cell_itemsets in iter_store_cells(store, engine, min_support, workers, fptree_mode, top_k, itemsets):
+      if cell_itemsets:
+        sink.write_cell(get_level(cell), cell, decode_cell_itemsets(store, cell_itemsets))
+  return sink.itemsets - written
+
+def main():
+  from utils import get_config_info, print_table
+  from cache import load_store
+  from stats import instrument
+  config_data = get_config_info()
+  parser = argparse.ArgumentParser(description='Mine the dataset of config.ini with one or more engines.')
+  parser.add_argument('engines', nargs='*', choices=ENGINES, default=None, help='engines to run, default the engines key of config.ini')
+  parser.add_argument('--min-support', type=int, default=int(config_data['min_support']))
+  parser.add_argument('--workers', type=int, default=int(config_data.get('workers', 1)))
+  parser.add_argument('--itemsets', choices=['all', 'closed', 'maximal'], default=config_data.get('itemsets', 'all'))
+  parser.add_argument('--min-confidence', type=float, default=config_data.get('min_confidence'), help='also print the association rules of every cell')
+  parser.add_argument('--output', default=config_data.get('output_file'), help='stream the itemsets to a .csv, .jsonl or .bin file instead of printing them')
+  parser.add_argument('--page-size', type=int, default=config_data.get('page_size'), help='cells per printed table')
+  parser.add_argument('--max-itemsets', type=int, default=config_data.get('max_itemsets'), help='itemsets printed per cell')
+  args = parser.parse_args()
+  if args.min_confidence is not None and args.itemsets != 'all':
+    parser.error('association rules need all frequent itemsets')
+  engines = args.engines
+  if not engines:
+    engines = [engine.strip() for engine in config_data.get('engines', 'apriori').split(',')]
+  with instrument(config_data.get('stats_file'), config_data.get('profile_file')):
+    t1 = datetime.datetime.now()
+    store = load_store(config_data)
+    t2 = datetime.datetime.now()
+    print('Time taken in (seconds) to load the dataset:', (t2-t1).total_seconds())
+    for engine in engines:
+      if args.output:
+        from sinks import get_sink
+        filename = args.output
+        if len(engines) > 1:
+          root, extension = os.path.splitext(args.output)
+          filename = root + '_' + engine + extension
+        t1 = datetime.datetime.now()
+        with get_sink(filename) as sink:
+          written = mine_to_sink(sink, store, engine, args.min_support, args.workers, config_data.get('fptree_mode', 'cell'), itemsets=args.itemsets)
+        t2 = datetime.datetime.now()
+        print('Total time taken in (seconds) by', engine, 'algorithm:', (t2-t1).total_seconds())
+        print('Itemsets written to', filename + ':', written)
+        continue
+      t1 = datetime.datetime.now()
+      result = mine(store, engine, args.min_support, args.workers, config_data.get('fptree_mode', 'cell'), itemsets=args.itemsets)
+      t2 = datetime.datetime.now()
+      total_time = t2-t1
+      print(20*'*')
+      print('Total time taken in (seconds) by', engine, 'algorithm:', total_time.total_seconds())
+      print('Min support value:', args.min_support)
+      if args.itemsets != 'all':
+        print('Itemsets:', args.itemsets)
+      print(20*'*')
+      print_table(result['zero_star'], 'Itemsets for CMB', args.page_size, args.max_itemsets)
+      print_table(result['one_star'], 'Itemsets for 1 star CMP', args.page_size, args.max_itemsets)
+      print_table(result['two_star'], 'Itemsets for 2 star', args.page_size, args.max_itemsets)
+      if 'result_db' in config_data:
+        from results import ResultStore
+        with ResultStore(config_data['result_db']) as results:
+          run_id = results.save(result, engine, args.min_support, args.itemsets)
+        print('Saved as run', run_id, 'of', config_data['result_db'])
+      if args.min_confidence is not None:
+        from rules import get_rule_store, print_rules
+        print_rules(get_rule_store(store, result, float(args.min_confidence)), 'Association rules')
+
+if '__main__' == __name__:
+  main()
@@ -0,0 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from stats import STATS
+
+def get_cell_batches(cells, sizes, workers):
+  # largest cells first, so the long running ones start early, and the
+  # small ones packed together until a batch reaches its share of the work
+  order = sorted(cells, key=lambda cell: sizes.get(cell, 1), reverse=True)
+  batch_size = sum(sizes.get(cell, 1) for cell in order) / (workers * 4)
+  batches = []
+  batch = []
+  batch_total = 0
+  for cell in order:
+    batch.append(cell)
+    batch_total += sizes.get(cell, 1)
+    if batch_total >= batch_size:
+      batches.append(batch)
+      batch = []
+      batch_total = 0
+  if len(batch) > 0:
+    batches.append(batch)
+  return batches
+
+def get_cell_sizes(cells, get_size):
+  # {cell: size} of {cell: value}, what get_cell_batches balances on
+  sizes = {}
+  for cell, value in cells.items():
+    sizes[cell] = get_size(value)
+  return sizes
+
+def mine_batch(mine_cell, batch):
+  return [(cell, mine_cell(value)) for cell, value in batch]
+
+def mine_batch_with_stats(mine_cell, batch):
+  # a worker collects its own statistics and sends them back
+  STATS.reset()
+  STATS.enabled = True
+  results = mine_batch(mine_cell, batch)
+  return results, STATS.to_dict()
+
+def mine_cells(mine_cell, cells, workers=1, sizes=None):
+  """
+  Apply mine_cell to the value of every cell of {cell: value}, fanning
+  the cells out to a pool of worker processes when workers > 1. Each
+  worker is sent only the values of its own cells. Results come back as
+  {cell: result} in the order of cells whatever the schedule was.
+  """
+  results = dict(iter_mined_cells(mine_cell, cells, workers, sizes))
+  return {cell: results[cell] for cell in cells}
+
+def iter_mined_cells(mine_cell, cells, workers=1, sizes=None):
+  """
+  Yield (cell, result) as soon as each cell of {cell: value} is mined,
+  a batch at a time when workers > 1, so a caller writing them out never
+  holds more than the batches not yet consumed.
+  """
+  if sizes is None:
+    sizes = {}
+  if workers <= 1 or len(cells) <= 1:
+    for cell, value in cells.items():
+      yield cell, mine_cell(value)
+    return
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    futures = set()
+    for batch in get_cell_batches(cells, sizes, workers):
+      batch = [(cell, cells[cell]) for cell in batch]
+      if STATS.enabled:
+        futures.add(executor.submit(mine_batch_with_stats, mine_cell, batch))
+      else:
+        futures.add(executor.submit(mine_batch, mine_cell, batch))
+    for future in as_completed(futures):
+      # drop the future so its results are freed once yielded
+      futures.discard(future)
+      if STATS.enabled:
+        batch_results, batch_stats = future.result()
+        STATS.merge(batch_stats)
+      else:
+        batch_results = future.result()
+      for cell, result in batch_results:
+        yield cell, result
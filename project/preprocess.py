@@ -1,87 +1,256 @@
-import csv
-
-def get_compound_list(rows):
-  so2_list = []
-  no2_list = []
-  pmt_list = []
-  for row in rows:
-    try:
-      x = float(row[5])
-      so2_list.append(x)
-    except ValueError:
-      so2_list.append(0)
-    try:
-      x = float(row[6])
-      no2_list.append(x)
-    except ValueError:
-      no2_list.append(0)
-    try:
-      x = float(row[7])
-      pmt_list.append(x)
-    except ValueError:
-      pmt_list.append(0)
-  so2_max, so2_min = max(so2_list), min(so2_list)
-  no2_max, no2_min = max(no2_list), min(no2_list)
-  pmt_max, pmt_min = max(pmt_list), min(pmt_list)
-  so2_part = (so2_max-so2_min)/3
-  so2_lim1 = so2_min + so2_part
-  so2_lim2 = so2_min + 2*so2_part
-  for i in range(len(so2_list)):
-    so2 = so2_list[i]
-    if so2 >= so2_min and so2 < so2_lim1:
-      so2_list[i] = 'so21'
-    elif so2 >= so2_lim1 and so2 < so2_lim2:
-      so2_list[i] = 'so22'
-    else:
-      so2_list[i] = 'so23'
-  for i in range(len(no2_list)):
-    no2 = no2_list[i]
-    no2_part = (no2_max-no2_min)/3
-    no2_lim1 = no2_min + no2_part
-    no2_lim2 = no2_min + 2*no2_part
-    if no2 >= no2_min and no2 < no2_lim1:
-      no2_list[i] = 'no21'
-    elif no2 >= no2_lim1 and no2 < no2_lim2:
-      no2_list[i] = 'no22'
-    else:
-      no2_list[i] = 'no23'
-  for i in range(len(pmt_list)):
-    pmt = pmt_list[i]
-    pmt_part = (pmt_max-pmt_min)/3
-    pmt_lim1 = pmt_min + pmt_part
-    pmt_lim2 = pmt_min + 2*pmt_part
-    if pmt >= pmt_min and pmt < pmt_lim1:
-      pmt_list[i] = 'pmt1'
-    elif pmt >= pmt_lim1 and pmt < pmt_lim2:
-      pmt_list[i] = 'pmt2'
+import datetime
+import numpy as np
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'Semptember', 'October', 'November', 'December']
+
+DEFAULT_SETTINGS = {
+  # item prefix -> csv column, the prefix must be 3 characters long
+  'compounds': [('so2', 'SO2'), ('no2', 'NO2'), ('pmt', 'RSPM/PM10')],
+  'bins': 3,
+  # equal_width, quantile or thresholds
+  'strategy': 'equal_width',
+  # item prefix -> inner bin edges, for the thresholds strategy
+  'thresholds': {},
+  # zero (count a missing value as 0), drop (drop the row) or skip (leave the item out)
+  'missing_values': 'zero',
+  # location of a transaction: station, city or state
+  'location': 'city',
+  # time of a transaction, one of TIME_LEVELS
+  'time': 'month_of_year',
+  # format of the sampling dates, parsed once per chunk
+  'date_format': '%d/%m/%Y'
+}
+
+# month_of_year is the month name alone, every other level is year aware:
+# 2009-01-05, 2009-W02, 2009-01, 2009-Q1, 2009 winter, 2009
+TIME_LEVELS = ['day', 'week', 'month', 'quarter', 'season', 'year', 'month_of_year']
+
+# seasons of the India Meteorological Department, by month number
+SEASONS = ['winter', 'winter', 'pre-monsoon', 'pre-monsoon', 'pre-monsoon', 'monsoon', 'monsoon', 'monsoon', 'monsoon', 'post-monsoon', 'post-monsoon', 'post-monsoon']
+
+# csv columns of the spatial hierarchy, state > city > monitoring station
+STATE_COLUMN = 1
+CITY_COLUMN = 2
+STATION_COLUMN = 3
+
+def get_discretisation_settings(config_data):
+  settings = dict(DEFAULT_SETTINGS)
+  settings['thresholds'] = {}
+  if 'compounds' in config_data:
+    settings['compounds'] = []
+    for compound in config_data['compounds'].split(','):
+      prefix, column = compound.strip().split(':', 1)
+      if len(prefix) != 3:
+        raise ValueError('compound prefix must be 3 characters long: ' + prefix)
+      settings['compounds'].append((prefix, column))
+  if 'bins' in config_data:
+    settings['bins'] = int(config_data['bins'])
+  if 'bin_strategy' in config_data:
+    settings['strategy'] = config_data['bin_strategy']
+  if 'bin_thresholds' in config_data:
+    for thresholds in config_data['bin_thresholds'].split(','):
+      prefix, edges = thresholds.strip().split(':', 1)
+      settings['thresholds'][prefix] = [float(edge) for edge in edges.split()]
+  if 'missing_values' in config_data:
+    settings['missing_values'] = config_data['missing_values']
+  if 'location_level' in config_data:
+    settings['location'] = config_data['location_level']
+  if 'time_level' in config_data:
+    settings['time'] = config_data['time_level']
+  if 'date_format' in config_data:
+    settings['date_format'] = config_data['date_format']
+  if not settings['strategy'] in ('equal_width', 'quantile', 'thresholds'):
+    raise ValueError('unknown bin strategy: ' + settings['strategy'])
+  if not settings['missing_values'] in ('zero', 'drop', 'skip'):
+    raise ValueError('unknown missing value handling: ' + settings['missing_values'])
+  if not settings['location'] in ('station', 'city', 'state'):
+    raise ValueError('unknown location level: ' + settings['location'])
+  if not settings['time'] in TIME_LEVELS:
+    raise ValueError('unknown time level: ' + settings['time'])
+  return settings
+
+def read_chunks(filename, chunk_size, names=None):
+  # filename may also be an open file; with names the header row is not read.
+  # pandas is only imported once a file is read
+  import pandas as pd
+  if names is None:
+    return pd.read_csv(filename, dtype=str, keep_default_na=False, chunksize=chunk_size)
+  return pd.read_csv(filename, header=None, names=names, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+def get_compound_values(chunk, settings):
+  # item prefix -> float array with nan for missing values, after the
+  # missing value handling of settings
+  import pandas as pd
+  values = {}
+  for prefix, column in settings['compounds']:
+    values[prefix] = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+  if settings['missing_values'] == 'zero':
+    for prefix in values:
+      values[prefix] = np.nan_to_num(values[prefix], nan=0.0)
+  elif settings['missing_values'] == 'drop':
+    is_complete = np.ones(len(chunk), dtype=bool)
+    for prefix in values:
+      is_complete &= ~np.isnan(values[prefix])
+    for prefix in values:
+      values[prefix] = values[prefix][is_complete]
+    return values, is_complete
+  return values, None
+
+def get_bin_edges(filename, settings=DEFAULT_SETTINGS, chunk_size=10000):
+  """
+  First pass over the file: return item prefix -> inner bin edges.
+  Equal width bins only keep a running min and max, quantile bins keep
+  the compound columns.
+  """
+  bins = settings['bins']
+  if settings['strategy'] == 'thresholds':
+    bin_edges = {}
+    for prefix, column in settings['compounds']:
+      if not prefix in settings['thresholds']:
+        raise ValueError('no bin thresholds for compound: ' + prefix)
+      bin_edges[prefix] = np.sort(np.array(settings['thresholds'][prefix], dtype=float))
+    return bin_edges
+  compound_min = {}
+  compound_max = {}
+  compound_values = {}
+  for prefix, column in settings['compounds']:
+    compound_min[prefix] = np.inf
+    compound_max[prefix] = -np.inf
+    compound_values[prefix] = []
+  for chunk in read_chunks(filename, chunk_size):
+    values, is_complete = get_compound_values(chunk, settings)
+    for prefix, column_values in values.items():
+      column_values = column_values[~np.isnan(column_values)]
+      if len(column_values) == 0:
+        continue
+      if settings['strategy'] == 'quantile':
+        compound_values[prefix].append(column_values)
+      else:
+        compound_min[prefix] = min(compound_min[prefix], column_values.min())
+        compound_max[prefix] = max(compound_max[prefix], column_values.max())
+  bin_edges = {}
+  for prefix, column in settings['compounds']:
+    if settings['strategy'] == 'quantile':
+      values = np.concatenate(compound_values[prefix]) if len(compound_values[prefix]) > 0 else np.zeros(1)
+      bin_edges[prefix] = np.quantile(values, np.arange(1, bins) / bins)
     else:
-      pmt_list[i] = 'pmt3'
-  compound_list = []
-  for i in range(len(so2_list)):
-    compound_list.append([so2_list[i], no2_list[i], pmt_list[i]])
-  return compound_list
-
-def get_place_list(rows):
-  location = []
-  for row in rows:
-    location.append(row[2])
-  return location
-
-def get_month_list(rows):
-  months = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'Semptember', 'October', 'November', 'December']
-  return [months[int(row[0].split('/')[1])-1] for row in rows]
-
-def get_preprocessed_data(filename):
-  fptr = open(filename, 'r')
-  csvread = csv.reader(fptr)
-  rows = []
-  for row in csvread:
-    rows.append(row)
-  rows = rows[1:]
-  compound_list = get_compound_list(rows)
-  location_list = get_place_list(rows)
-  time_list = get_month_list(rows)
+      if compound_min[prefix] == np.inf:
+        compound_min[prefix], compound_max[prefix] = 0.0, 0.0
+      part = (compound_max[prefix]-compound_min[prefix])/bins
+      bin_edges[prefix] = compound_min[prefix] + part*np.arange(1, bins)
+  return bin_edges
+
+def get_compound_list(values, bin_edges, settings):
+  # bin i holds the values in [edge i-1, edge i), the last bin is open
+  columns = []
+  for prefix, column in settings['compounds']:
+    bin_numbers = np.searchsorted(bin_edges[prefix], values[prefix], side='right') + 1
+    items = np.char.add(prefix, bin_numbers.astype(str)).astype(object)
+    items[np.isnan(values[prefix])] = None
+    columns.append(items)
+  if settings['missing_values'] == 'skip':
+    return [[item for item in compounds if item is not None] for compounds in zip(*columns)]
+  return [list(compounds) for compounds in zip(*columns)]
+
+def get_city_list(chunk):
+  # city names only identify a city within its state, Aurangabad being
+  # one in Bihar and one in Maharashtra
+  return (chunk.iloc[:, STATE_COLUMN] + ' / ' + chunk.iloc[:, CITY_COLUMN]).tolist()
+
+def get_station_list(chunk):
+  # station names only identify a station within its city
+  return (chunk.iloc[:, STATE_COLUMN] + ' / ' + chunk.iloc[:, CITY_COLUMN] + ' / ' + chunk.iloc[:, STATION_COLUMN]).tolist()
+
+def get_place_list(chunk, level='city'):
+  if level == 'station':
+    return get_station_list(chunk)
+  if level == 'state':
+    return chunk.iloc[:, STATE_COLUMN].tolist()
+  return get_city_list(chunk)
+
+def update_location_parents(location_parents, chunk):
+  # {level: {place of the level below: its place at level}} of the
+  # spatial hierarchy station > city > state > *, with the places of chunk
+  stations = get_station_list(chunk)
+  cities = get_city_list(chunk)
+  states = chunk.iloc[:, STATE_COLUMN].tolist()
+  for level in ('city', 'state', '*'):
+    location_parents.setdefault(level, {})
+  for station, city, state in zip(stations, cities, states):
+    location_parents['city'][station] = city
+    location_parents['state'][city] = state
+    location_parents['*'][state] = '*'
+
+def get_dates(chunk, date_format='%d/%m/%Y'):
+  import pandas as pd
+  return pd.to_datetime(chunk.iloc[:, 0], format=date_format)
+
+def get_month_label(date):
+  return '%04d-%02d' % (date.year, date.month)
+
+def get_time_label(date, level='month_of_year'):
+  # label of a datetime.date at a level of TIME_LEVELS
+  if level == 'day':
+    return date.isoformat()
+  if level == 'week':
+    year, week = date.isocalendar()[:2]
+    return '%04d-W%02d' % (year, week)
+  if level == 'month':
+    return get_month_label(date)
+  if level == 'quarter':
+    return '%04d-Q%d' % (date.year, (date.month-1) // 3 + 1)
+  if level == 'season':
+    return '%04d %s' % (date.year, SEASONS[date.month-1])
+  if level == 'year':
+    return '%04d' % date.year
+  return MONTHS[date.month-1]
+
+def get_label_date(label, level):
+  # first day of the period of a day, month or quarter label
+  if level == 'day':
+    return datetime.date.fromisoformat(label)
+  if level == 'month':
+    return datetime.date(int(label[:4]), int(label[5:7]), 1)
+  if level == 'quarter':
+    return datetime.date(int(label[:4]), 3*int(label[6:])-2, 1)
+  raise ValueError('no date of a %s label: %s' % (level, label))
+
+def get_time_list(dates, level='month_of_year'):
+  # labels of a series of dates, every distinct date labelled once
+  labels = {}
+  for date in dates.dt.date.unique():
+    labels[date] = get_time_label(date, level)
+  return [labels[date] for date in dates.dt.date]
+
+def get_preprocessed_chunk(chunk, bin_edges, settings, dated=False, location_parents=None):
+  # dated transactions carry their sampling date as a fourth field; a
+  # location_parents dict is updated with the places of the chunk
+  values, is_complete = get_compound_values(chunk, settings)
+  if is_complete is not None:
+    chunk = chunk[is_complete]
+  if location_parents is not None:
+    update_location_parents(location_parents, chunk)
+  compound_list = get_compound_list(values, bin_edges, settings)
+  location_list = get_place_list(chunk, settings.get('location', 'city'))
+  dates = get_dates(chunk, settings.get('date_format', '%d/%m/%Y'))
+  time_list = get_time_list(dates, settings.get('time', 'month_of_year'))
+  if dated:
+    return [list(transaction) for transaction in zip(compound_list, location_list, time_list, dates.dt.date.tolist())]
+  return [list(transaction) for transaction in zip(compound_list, location_list, time_list)]
+
+def iter_preprocessed_data(filename, chunk_size=10000, settings=DEFAULT_SETTINGS, bin_edges=None, names=None, dated=False, location_parents=None):
+  """
+  Yield the preprocessed transactions of filename in lists of at most
+  chunk_size, reading the file twice: once for the bin edges and once
+  to discretise, so only one chunk of rows is held in memory.
+  """
+  if bin_edges is None:
+    bin_edges = get_bin_edges(filename, settings, chunk_size)
+  for chunk in read_chunks(filename, chunk_size, names):
+    yield get_preprocessed_chunk(chunk, bin_edges, settings, dated, location_parents)
+
+def get_preprocessed_data(filename, chunk_size=10000, settings=DEFAULT_SETTINGS):
   test_data = []
-  for i in range(len(compound_list)):
-    test_data.append([compound_list[i], location_list[i], time_list[i]])
+  for chunk in iter_preprocessed_data(filename, chunk_size, settings):
+    test_data.extend(chunk)
   return test_data
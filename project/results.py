@@ -0,0 +1,175 @@
+"""
+Mined itemsets kept in a SQLite file, indexed by cell and by item.
+
+  from results import ResultStore
+  with ResultStore('results.db') as results:
+    run_id = results.save(mine(store, 'fptree', 3), 'fptree', 3)
+    results.get_cells(['so23', 'pmt3'])
+    results.get_top_itemsets(('*', 'March'))
+
+Every save is a run of its own; queries answer from the last run unless
+run_id is given. Run as a script to query the result_db of config.ini:
+
+  python results.py cells so23 pmt3
+  python results.py top '*' March
+"""
+import argparse
+import datetime
+import sqlite3
+from cube import LEVELS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY,
+  engine TEXT,
+  min_support INTEGER,
+  itemsets TEXT,
+  created TEXT
+);
+CREATE TABLE IF NOT EXISTS itemsets (
+  id INTEGER PRIMARY KEY,
+  run_id INTEGER,
+  level TEXT,
+  location TEXT,
+  time TEXT,
+  items TEXT,
+  size INTEGER,
+  support INTEGER
+);
+CREATE TABLE IF NOT EXISTS itemset_items (
+  run_id INTEGER,
+  itemset_id INTEGER,
+  item TEXT
+);
+CREATE INDEX IF NOT EXISTS itemsets_by_cell ON itemsets (run_id, location, time, support);
+CREATE INDEX IF NOT EXISTS itemsets_by_time ON itemsets (run_id, time);
+CREATE INDEX IF NOT EXISTS itemset_items_by_item ON itemset_items (run_id, item, itemset_id);
+"""
+
+class ResultStore(object):
+  """
+  Runs of mine() results in the SQLite file filename. Itemsets come back
+  as (location, time, items, support) with items a tuple of item names.
+  """
+  def __init__(self, filename):
+    self.connection = sqlite3.connect(filename)
+    self.connection.executescript(SCHEMA)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def close(self):
+    self.connection.close()
+
+  def save(self, result, engine, min_support, itemsets='all'):
+    # one transaction per run, returns its id
+    with self.connection:
+      cursor = self.connection.execute(
+        'INSERT INTO runs (engine, min_support, itemsets, created) VALUES (?, ?, ?, ?)',
+        (engine, min_support, itemsets, datetime.datetime.now().isoformat()))
+      run_id = cursor.lastrowid
+      for level in LEVELS:
+        for (location, time), cell_itemsets in result[level].items():
+          for itemset, support in cell_itemsets:
+            cursor.execute(
+              'INSERT INTO itemsets (run_id, level, location, time, items, size, support) VALUES (?, ?, ?, ?, ?, ?, ?)',
+              (run_id, level, location, time, ','.join(itemset), len(itemset), support))
+            itemset_id = cursor.lastrowid
+            cursor.executemany('INSERT INTO itemset_items (run_id, itemset_id, item) VALUES (?, ?, ?)',
+                               [(run_id, itemset_id, item) for item in itemset])
+    return run_id
+
+  def get_runs(self):
+    # (id, engine, min_support, itemsets, created) of every run
+    return self.connection.execute('SELECT id, engine, min_support, itemsets, created FROM runs ORDER BY id').fetchall()
+
+  def get_run_id(self, run_id=None):
+    if run_id is not None:
+      return run_id
+    row = self.connection.execute('SELECT MAX(id) FROM runs').fetchone()
+    if row[0] is None:
+      raise ValueError('no run saved yet')
+    return row[0]
+
+  def get_cells(self, items, exact=True, run_id=None):
+    """
+    Itemsets made of items in every cell they are frequent in, most
+    frequent first, or with exact=False every itemset holding items.
+    """
+    items = sorted(set(items))
+    # the itemsets holding every item come off the item index of the run,
+    # and only those are looked up in itemsets by id
+    query = ('SELECT location, time, items, support FROM ('
+             'SELECT itemset_id FROM itemset_items WHERE run_id = ? AND item IN (%s) '
+             'GROUP BY itemset_id HAVING COUNT(*) = ?) AS matches '
+             'JOIN itemsets ON itemsets.id = matches.itemset_id' % ','.join('?' * len(items)))
+    parameters = [self.get_run_id(run_id)] + items + [len(items)]
+    if exact:
+      query += ' WHERE size = ?'
+      parameters.append(len(items))
+    query += ' ORDER BY support DESC, size, location, time'
+    return self.get_itemsets(query, parameters)
+
+  def get_top_itemsets(self, cell, limit=10, min_size=2, run_id=None):
+    # the limit most frequent itemsets of a (location, time) or star cell
+    query = ('SELECT location, time, items, support FROM itemsets '
+             'WHERE run_id = ? AND location = ? AND time = ? AND size >= ? '
+             'ORDER BY support DESC, size DESC, items LIMIT ?')
+    return self.get_itemsets(query, [self.get_run_id(run_id), cell[0], cell[1], min_size, limit])
+
+  def get_cell_itemsets(self, location=None, time=None, run_id=None):
+    # every itemset of a location, a time or both, '*' matching the star cells
+    query = 'SELECT location, time, items, support FROM itemsets WHERE run_id = ?'
+    parameters = [self.get_run_id(run_id)]
+    if location is not None:
+      query += ' AND location = ?'
+      parameters.append(location)
+    if time is not None:
+      query += ' AND time = ?'
+      parameters.append(time)
+    query += ' ORDER BY location, time, support DESC'
+    return self.get_itemsets(query, parameters)
+
+  def get_itemsets(self, query, parameters):
+    rows = self.connection.execute(query, parameters).fetchall()
+    return [(location, time, tuple(items.split(',')), support) for location, time, items, support in rows]
+
+
+def print_itemsets(itemsets, title):
+  from prettytable import PrettyTable
+  print(title)
+  table = PrettyTable(['Location', 'Time', 'Itemset', 'Count'])
+  for location, time, items, support in itemsets:
+    table.add_row([location, time, items, support])
+  print(table)
+
+def main():
+  from utils import get_config_info
+  config_data = get_config_info()
+  parser = argparse.ArgumentParser(description='Query the itemsets saved in the result_db of config.ini.')
+  parser.add_argument('--db', default=config_data.get('result_db', 'results.db'))
+  parser.add_argument('--run', type=int, help='run id, default the last run')
+  commands = parser.add_subparsers(dest='command', required=True)
+  cells = commands.add_parser('cells', help='cells an itemset is frequent in')
+  cells.add_argument('items', nargs='+')
+  cells.add_argument('--supersets', action='store_true', help='also itemsets holding the items')
+  top = commands.add_parser('top', help='most frequent itemsets of a cell')
+  top.add_argument('location')
+  top.add_argument('time')
+  top.add_argument('--limit', type=int, default=10)
+  commands.add_parser('runs', help='runs saved')
+  args = parser.parse_args()
+  with ResultStore(args.db) as results:
+    if args.command == 'runs':
+      for run in results.get_runs():
+        print(*run)
+    elif args.command == 'cells':
+      print_itemsets(results.get_cells(args.items, not args.supersets, args.run), 'Cells of ' + ', '.join(args.items))
+    else:
+      print_itemsets(results.get_top_itemsets((args.location, args.time), args.limit, run_id=args.run), 'Top itemsets of (%s, %s)' % (args.location, args.time))
+
+if '__main__' == __name__:
+  main()
@@ -0,0 +1,117 @@
+"""
+Association rules of the frequent itemsets of every cell.
+
+  from mining import mine
+  from rules import get_rule_store
+  result = mine(store, 'fptree', 3)
+  rule_store = get_rule_store(store, result, min_confidence=0.6)
+  rule_store.get_rules(('Assam / Guwahati', '*'), ['so23'])
+
+Rules are generated per (location, time) and star cell with ap-genrules:
+the consequents of an itemset grow one item at a time, and only out of
+consequents whose rule reached min_confidence, since moving an item from
+the antecedent to the consequent never raises the confidence. result must
+hold every frequent itemset, not only the closed, maximal or top k ones,
+so that the support of every antecedent and consequent is known.
+"""
+import numpy as np
+from utils import get_star_items_of_location_times
+from cube import get_star_cells, rollup_cells, merge_counts, LEVELS
+from candidates import generate_candidates
+from stats import STATS
+
+class RuleStore(object):
+  """
+  Rules as (antecedent, consequent, support, confidence, lift), indexed
+  by cell and by (cell, item) for every item of the antecedent.
+  """
+  def __init__(self):
+    self.rules_by_cell = {}
+    self.rules_by_item = {}
+
+  def __len__(self):
+    return sum(len(rules) for rules in self.rules_by_cell.values())
+
+  def add(self, cell, rule):
+    self.rules_by_cell.setdefault(cell, []).append(rule)
+    for item in rule[0]:
+      self.rules_by_item.setdefault((cell, item), []).append(rule)
+
+  def get_rules(self, cell, items=()):
+    # rules of cell whose antecedent holds all of items, most confident first
+    if len(items) == 0:
+      rules = self.rules_by_cell.get(cell, [])
+    else:
+      # look up the least common item and check the others on its rules
+      candidates = min((self.rules_by_item.get((cell, item), []) for item in items), key=len)
+      rules = [rule for rule in candidates if set(items).issubset(rule[0])]
+    return sorted(rules, key=lambda rule: (-rule[3], -rule[4], rule[0], rule[1]))
+
+  def get_cells(self):
+    return list(self.rules_by_cell.keys())
+
+
+def get_item_counts_by_cell(store):
+  # {cell: {item: support}} and {cell: transactions} of every cell and star cell
+  item_counts = {}
+  transaction_counts = {}
+  for cell_id, cell in enumerate(store.cells):
+    counts = np.bincount(store.get_cell_transactions(cell_id)[1], minlength=len(store.items))
+    item_counts[cell] = {store.items[item]: int(counts[item]) for item in np.flatnonzero(counts)}
+    transaction_counts[cell] = store.get_cell_size(cell_id)
+  star_cells = get_star_cells(get_star_items_of_location_times(store.cells))
+  item_counts.update(rollup_cells(item_counts, star_cells, merge_counts))
+  transaction_counts.update(rollup_cells(transaction_counts, star_cells, sum))
+  return item_counts, transaction_counts
+
+def get_rules_of_itemset(itemset, support, supports, transaction_count, min_confidence):
+  """
+  ap-genrules on one itemset: the rules antecedent -> consequent with
+  antecedent and consequent splitting itemset, as in RuleStore.
+  """
+  rules = []
+  items = frozenset(itemset)
+  consequents = [(item,) for item in sorted(items)]
+  while len(consequents) > 0 and len(consequents[0]) < len(items):
+    confident = []
+    for consequent in consequents:
+      antecedent = items.difference(consequent)
+      confidence = support / float(supports[antecedent])
+      if confidence >= min_confidence:
+        lift = confidence * transaction_count / supports[frozenset(consequent)]
+        rules.append((tuple(sorted(antecedent)), consequent, support, confidence, lift))
+        confident.append(consequent)
+    STATS.count('rules_tested', len(consequents))
+    # a consequent one item larger needs every one of its subsets confident
+    consequents = generate_candidates(confident, 'consequent_generation', 'consequents')
+  return rules
+
+def get_rule_store(store, result, min_confidence):
+  """
+  Rules of the zero, one and two star itemsets of a mine() result with a
+  confidence of at least min_confidence.
+  """
+  rule_store = RuleStore()
+  with STATS.phase('rule_generation'):
+    item_counts, transaction_counts = get_item_counts_by_cell(store)
+    for level in LEVELS:
+      for cell, itemsets in result[level].items():
+        supports = {}
+        for item, count in item_counts[cell].items():
+          supports[frozenset([item])] = count
+        for itemset, count in itemsets:
+          supports[frozenset(itemset)] = count
+        for itemset, count in itemsets:
+          for rule in get_rules_of_itemset(itemset, count, supports, transaction_counts[cell], min_confidence):
+            rule_store.add(cell, rule)
+  STATS.count('rules', len(rule_store))
+  return rule_store
+
+def print_rules(rule_store, title):
+  from prettytable import PrettyTable
+  print(title)
+  table = PrettyTable(['Location', 'Time', 'Antecedent', 'Consequent', 'Support', 'Confidence', 'Lift'])
+  for cell in rule_store.get_cells():
+    for antecedent, consequent, support, confidence, lift in rule_store.get_rules(cell):
+      table.add_row([cell[0], cell[1], antecedent, consequent, support, round(confidence, 3), round(lift, 3)])
+  print(table)
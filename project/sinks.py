@@ -0,0 +1,137 @@
+"""
+Streaming writers for mined itemsets, one cell at a time.
+
+  from sinks import get_sink
+  with get_sink('itemsets.jsonl') as sink:
+    mine_to_sink(sink, store, 'fptree', 3)
+
+Every sink has write_cell(level, cell, itemsets), itemsets being
+(itemset, count) pairs of item names, and writes them out before the
+next cell comes, so the output never has to be built in memory. The
+format follows the file extension: .csv, .jsonl or .bin, a compact
+binary format read back with read_binary.
+"""
+import csv
+import json
+import struct
+from cube import LEVELS
+
+MAGIC = b'FPIS\x01'
+
+class Sink(object):
+  def __init__(self, filename, mode='w'):
+    if mode == 'w':
+      self.file = open(filename, 'w', newline='')
+    else:
+      self.file = open(filename, mode)
+    self.itemsets = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def write_cell(self, level, cell, itemsets):
+    raise NotImplementedError
+
+  def close(self):
+    self.file.close()
+
+
+class CsvSink(Sink):
+  # one row per itemset, the items joined by spaces
+  def __init__(self, filename):
+    Sink.__init__(self, filename)
+    self.writer = csv.writer(self.file)
+    self.writer.writerow(['level', 'location', 'time', 'itemset', 'size', 'count'])
+
+  def write_cell(self, level, cell, itemsets):
+    for itemset, count in itemsets:
+      self.writer.writerow([level, cell[0], cell[1], ' '.join(itemset), len(itemset), count])
+    self.itemsets += len(itemsets)
+
+
+class JsonLinesSink(Sink):
+  # one json object per itemset
+  def write_cell(self, level, cell, itemsets):
+    for itemset, count in itemsets:
+      line = {'level': level, 'location': cell[0], 'time': cell[1], 'itemset': list(itemset), 'count': count}
+      self.file.write(json.dumps(line) + '\n')
+    self.itemsets += len(itemsets)
+
+
+class BinarySink(Sink):
+  """
+  MAGIC, then records of a one byte tag:
+    b'I' an item: uint16 id, then its name
+    b'C' a cell: level byte, location, time, uint32 number of itemsets,
+         then every itemset as uint8 size, size uint16 item ids and a
+         uint32 count
+  names being a uint16 length and utf-8 bytes, all little endian. An
+  item is written once, before the first cell holding it.
+  """
+  def __init__(self, filename):
+    Sink.__init__(self, filename, 'wb')
+    self.file.write(MAGIC)
+    self.item_ids = {}
+
+  def write_name(self, name):
+    name = str(name).encode('utf-8')
+    self.file.write(struct.pack('<H', len(name)) + name)
+
+  def write_cell(self, level, cell, itemsets):
+    for itemset, count in itemsets:
+      for item in itemset:
+        if not item in self.item_ids:
+          self.item_ids[item] = len(self.item_ids)
+          self.file.write(b'I' + struct.pack('<H', self.item_ids[item]))
+          self.write_name(item)
+    self.file.write(b'C' + struct.pack('<B', LEVELS.index(level)))
+    self.write_name(cell[0])
+    self.write_name(cell[1])
+    self.file.write(struct.pack('<I', len(itemsets)))
+    for itemset, count in itemsets:
+      ids = [self.item_ids[item] for item in itemset]
+      self.file.write(struct.pack('<B%dHI' % len(ids), len(ids), *ids, count))
+    self.itemsets += len(itemsets)
+
+
+def read_name(f):
+  length = struct.unpack('<H', f.read(2))[0]
+  return f.read(length).decode('utf-8')
+
+def read_binary(filename):
+  """
+  Yield (level, cell, itemsets) for every cell of a BinarySink file.
+  """
+  with open(filename, 'rb') as f:
+    if f.read(len(MAGIC)) != MAGIC:
+      raise ValueError('not an itemset file: ' + filename)
+    items = {}
+    while True:
+      tag = f.read(1)
+      if tag == b'':
+        break
+      if tag == b'I':
+        item_id = struct.unpack('<H', f.read(2))[0]
+        items[item_id] = read_name(f)
+        continue
+      level = LEVELS[struct.unpack('<B', f.read(1))[0]]
+      cell = (read_name(f), read_name(f))
+      itemsets = []
+      for _ in range(struct.unpack('<I', f.read(4))[0]):
+        size = struct.unpack('<B', f.read(1))[0]
+        values = struct.unpack('<%dHI' % size, f.read(2*size + 4))
+        itemsets.append((tuple(items[item_id] for item_id in values[:-1]), values[-1]))
+      yield level, cell, itemsets
+
+SINKS = {'csv': CsvSink, 'jsonl': JsonLinesSink, 'bin': BinarySink}
+
+def get_sink(filename, format=None):
+  # format defaults to the extension of filename
+  if format is None:
+    format = filename.rsplit('.', 1)[-1]
+  if not format in SINKS:
+    raise ValueError('unknown output format: ' + format)
+  return SINKS[format](filename)
@@ -0,0 +1,104 @@
+"""
+Run statistics: wall time per phase and counters, off by default.
+
+  from stats import STATS, instrument
+  with instrument('stats.json', 'profile.out'):
+    mine(transactions, 'fptree', 3)
+
+Instrumented code calls STATS.phase(name), STATS.count(name, n) and
+STATS.maximum(name, n) a few times per cell or level, never per
+transaction, and every call returns at once while STATS is disabled.
+Phases can nest, so their times do not add up to the run time.
+"""
+import contextlib
+import cProfile
+import json
+import time
+
+class Phase(object):
+  __slots__ = ('stats', 'name', 'start')
+
+  def __init__(self, stats, name):
+    self.stats = stats
+    self.name = name
+
+  def __enter__(self):
+    self.start = time.perf_counter()
+
+  def __exit__(self, *exc_info):
+    self.stats.add_time(self.name, time.perf_counter() - self.start)
+
+
+class RunStats(object):
+  def __init__(self):
+    self.enabled = False
+    self.reset()
+
+  def reset(self):
+    self.phases = {}
+    self.counters = {}
+    self.maxima = {}
+
+  def phase(self, name):
+    if not self.enabled:
+      return NULL_PHASE
+    return Phase(self, name)
+
+  def add_time(self, name, seconds, calls=1):
+    phase = self.phases.get(name)
+    if phase is None:
+      phase = self.phases[name] = {'seconds': 0.0, 'calls': 0}
+    phase['seconds'] += seconds
+    phase['calls'] += calls
+
+  def count(self, name, value=1):
+    if self.enabled:
+      self.counters[name] = self.counters.get(name, 0) + value
+
+  def maximum(self, name, value):
+    if self.enabled and value > self.maxima.get(name, value-1):
+      self.maxima[name] = value
+
+  def merge(self, stats):
+    # add the to_dict() of another run, e.g. of a worker process
+    for name, phase in stats['phases'].items():
+      self.add_time(name, phase['seconds'], phase['calls'])
+    for name, value in stats['counters'].items():
+      self.count(name, value)
+    for name, value in stats['maxima'].items():
+      self.maximum(name, value)
+
+  def to_dict(self):
+    return {'phases': self.phases, 'counters': self.counters, 'maxima': self.maxima}
+
+  def to_json(self):
+    return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+
+NULL_PHASE = contextlib.nullcontext()
+STATS = RunStats()
+
+@contextlib.contextmanager
+def instrument(stats_file=None, profile_file=None):
+  """
+  Collect STATS while the block runs and write them as json to stats_file,
+  and profile the block with cProfile into profile_file. Either may be
+  None, with both None the block runs as is.
+  """
+  if stats_file is not None:
+    STATS.reset()
+    STATS.enabled = True
+  profiler = None
+  if profile_file is not None:
+    profiler = cProfile.Profile()
+    profiler.enable()
+  try:
+    yield STATS
+  finally:
+    if profiler is not None:
+      profiler.disable()
+      profiler.dump_stats(profile_file)
+    if stats_file is not None:
+      STATS.enabled = False
+      with open(stats_file, 'w') as f:
+        f.write(STATS.to_json())
@@ -0,0 +1,87 @@
+from itertools import chain
+import numpy as np
+from stats import STATS
+
+def get_one_hot(store, cell_id):
+  # (transaction x item) 0/1 matrix of one cell of a TransactionStore
+  STATS.maximum('largest_cell_transactions', store.get_cell_size(cell_id))
+  rows, item_ids = store.get_cell_transactions(cell_id)
+  one_hot = np.zeros((store.get_cell_size(cell_id), len(store.items)), dtype=np.uint8)
+  one_hot[rows, item_ids] = 1
+  return one_hot
+
+def get_tid_bitsets(one_hot):
+  # vertical layout of one cell: item -> python int with bit i set
+  # when the i-th transaction of the cell holds the item
+  packed = np.packbits(one_hot, axis=0, bitorder='little')
+  tid_bitsets = {}
+  for item in np.flatnonzero(one_hot.any(axis=0)):
+    tid_bitsets[int(item)] = int.from_bytes(packed[:, item].tobytes(), 'little')
+  return tid_bitsets
+
+def get_tid_bitsets_size(tid_bitsets):
+  # number of tids up to the last one holding an item
+  return max([bits.bit_length() for bits in tid_bitsets.values()] + [0])
+
+def merge_tid_bitsets(children):
+  # concatenate the tid spaces of the child cells, each child starting on
+  # a byte boundary so the merge is a join of byte strings
+  items = set(chain.from_iterable(children))
+  parts = {}
+  for item in items:
+    parts[item] = []
+  for tid_bitsets in children:
+    size = (get_tid_bitsets_size(tid_bitsets) + 7) >> 3
+    for item in items:
+      parts[item].append(tid_bitsets.get(item, 0).to_bytes(size, 'little'))
+  merged = {}
+  for item, item_parts in parts.items():
+    merged[item] = int.from_bytes(b''.join(item_parts), 'little')
+  return merged
+
+def get_cooccurrence_counts(one_hot):
+  # the gram matrix of the one-hot matrix of a cell holds the 1-itemset
+  # supports on the diagonal and every pair support off it. All cells
+  # share the item axis of the store so their matrices can be summed.
+  one_hot = one_hot.astype(np.int64)
+  return one_hot.T @ one_hot
+
+def get_vertical_layout_by_cell(store):
+  with STATS.phase('vertical_layout'):
+    tid_bitsets_by_cell = {}
+    cooccurrence_counts_by_cell = {}
+    for cell_id, cell in enumerate(store.cells):
+      one_hot = get_one_hot(store, cell_id)
+      tid_bitsets_by_cell[cell] = get_tid_bitsets(one_hot)
+      cooccurrence_counts_by_cell[cell] = get_cooccurrence_counts(one_hot)
+    return [tid_bitsets_by_cell, cooccurrence_counts_by_cell]
+
+def check_min_support(min_support):
+  # a threshold below 1 would take in itemsets that never occur
+  if min_support < 1:
+    raise ValueError('min_support must be at least 1')
+
+def get_frequent_pairs(cooccurrence_counts, min_support):
+  # pairs (i, j), i < j, that occur together in at least min_support
+  # transactions
+  with STATS.phase('level2_seeding'):
+    first, second = np.triu_indices(len(cooccurrence_counts), 1)
+    frequent = cooccurrence_counts[first, second] >= max(min_support, 1)
+    first, second = first[frequent], second[frequent]
+  return [((int(i), int(j)), int(cooccurrence_counts[i, j])) for i, j in zip(first, second)]
+
+def get_weighted_tid_bitsets(transaction_counts, item_count):
+  # tid bitsets of {item id tuple: count}, every distinct transaction
+  # taking count consecutive tids
+  one_hot = np.zeros((len(transaction_counts), item_count), dtype=np.uint8)
+  for row, items in enumerate(transaction_counts):
+    one_hot[row, list(items)] = 1
+  return get_tid_bitsets(np.repeat(one_hot, list(transaction_counts.values()), axis=0))
+
+def get_transaction_counts(one_hot):
+  # distinct transactions of a cell as item id tuples -> count
+  rows, counts = np.unique(one_hot, axis=0, return_counts=True)
+  transaction_counts = {}
+  for row, count in zip(rows, counts):
+    transaction_counts[tuple(np.flatnonzero(row).tolist())] = int(count)
+  return transaction_counts
@@ -0,0 +1,103 @@
+"""
+Support threshold sweep: mine once at the lowest threshold and answer
+every other one by filtering.
+
+  from sweep import sweep
+  results, lines = sweep(store, [2, 3, 10], engine='fptree')
+  results[3]['zero_star']
+
+A frequent or closed itemset at a threshold is one at a lower threshold
+with enough support, so each threshold is a cut of the itemsets of every
+cell sorted by support. Maximal itemsets depend on the threshold and
+cannot be swept, and neither can top k ones.
+"""
+import argparse
+import bisect
+import time
+from encoding import get_item_key
+from mining import mine, get_store, ENGINES
+from cube import LEVELS
+
+def get_support_index(result):
+  # {level: {cell: (negated counts, itemsets)}}, every cell sorted by
+  # decreasing support so a threshold cuts a prefix
+  index = {}
+  for level in LEVELS:
+    index[level] = {}
+    for cell, itemsets in result[level].items():
+      itemsets = sorted(itemsets, key=lambda itemset: -itemset[1])
+      index[level][cell] = ([-itemset[1] for itemset in itemsets], itemsets)
+  return index
+
+def get_result_at(index, min_support):
+  # the mine() result at min_support, itemsets in the same order
+  result = {}
+  for level in LEVELS:
+    result[level] = {}
+    for cell, (negated_counts, itemsets) in index[level].items():
+      end = bisect.bisect_right(negated_counts, -min_support)
+      if end > 0 or cell == ('*', '*'):
+        cell_itemsets = sorted(itemsets[:end], key=lambda itemset: [get_item_key(item) for item in itemset[0]])
+        cell_itemsets.sort(key=lambda itemset: len(itemset[0]))
+        result[level][cell] = cell_itemsets
+  return result
+
+def get_itemset_count(result, level):
+  return sum(len(itemsets) for itemsets in result[level].values())
+
+def sweep(transactions, supports, engine='fptree', workers=1, fptree_mode='cell', itemsets='all'):
+  """
+  The mine() result of every threshold of supports, mined once at the
+  lowest. Returns ({min_support: result}, lines), lines holding for the
+  run and every threshold its seconds and itemset count per level.
+  """
+  if itemsets == 'maximal':
+    raise ValueError('maximal itemsets cannot be swept, they depend on min_support')
+  supports = sorted(set(supports))
+  store = get_store(transactions)
+  start = time.perf_counter()
+  index = get_support_index(mine(store, engine, supports[0], workers, fptree_mode, itemsets=itemsets))
+  lines = [{'min_support': supports[0], 'step': 'mining', 'seconds': time.perf_counter() - start}]
+  results = {}
+  for min_support in supports:
+    start = time.perf_counter()
+    results[min_support] = get_result_at(index, min_support)
+    line = {'min_support': min_support, 'step': 'filtering', 'seconds': time.perf_counter() - start}
+    for level in LEVELS:
+      line[level] = get_itemset_count(results[min_support], level)
+    lines.append(line)
+  return results, lines
+
+def print_lines(lines):
+  from prettytable import PrettyTable
+  table = PrettyTable(['Min support', 'Step', 'Seconds', 'Zero star', 'One star', 'Two star'])
+  for line in lines:
+    table.add_row([line['min_support'], line['step'], round(line['seconds'], 4)] + [line.get(level, '') for level in LEVELS])
+  print(table)
+
+def main():
+  from utils import get_config_info, print_table
+  from cache import load_store
+  config_data = get_config_info()
+  default_supports = config_data.get('min_supports', config_data['min_support'])
+  parser = argparse.ArgumentParser(description='Mine the dataset of config.ini once for several support thresholds.')
+  parser.add_argument('supports', type=int, nargs='*', default=[int(value) for value in default_supports.split(',')])
+  parser.add_argument('--engine', choices=ENGINES, default='fptree')
+  parser.add_argument('--workers', type=int, default=int(config_data.get('workers', 1)))
+  parser.add_argument('--itemsets', choices=['all', 'closed'], default='all')
+  parser.add_argument('--tables', action='store_true', help='also print the itemsets of every threshold')
+  args = parser.parse_args()
+  store = load_store(config_data)
+  results, lines = sweep(store, args.supports, args.engine, args.workers, config_data.get('fptree_mode', 'cell'), args.itemsets)
+  print_lines(lines)
+  if args.tables:
+    for min_support, result in sorted(results.items()):
+      print(20*'*')
+      print('Min support value:', min_support)
+      print(20*'*')
+      print_table(result['zero_star'], 'Itemsets for CMB')
+      print_table(result['one_star'], 'Itemsets for 1 star CMP')
+      print_table(result['two_star'], 'Itemsets for 2 star')
+
+if '__main__' == __name__:
+  main()
@@ -0,0 +1,71 @@
+"""
+Synthetic monitoring data in the layout of datafile.csv, for benchmarks.
+
+  python synthetic.py out.csv --rows 100000 --locations 50 --months 12
+
+Every compound reading is a shared pollution level of the row mixed with
+noise of its own, so correlation sets how often compounds fall into the
+same bin together.
+"""
+import argparse
+import csv
+import numpy as np
+from preprocess import MONTHS
+
+HEADER = ['Sampling Date', 'State', 'City/Town/Village/Area', 'Location of Monitoring Station', 'Type of Location']
+# the compounds of datafile.csv first, then made up ones
+COMPOUNDS = [('so2', 'SO2'), ('no2', 'NO2'), ('pmt', 'RSPM/PM10'), ('spm', 'SPM')]
+BLOCK_SIZE = 100000
+
+def get_compounds(compound_count):
+  compounds = COMPOUNDS[:compound_count]
+  for index in range(len(compounds), compound_count):
+    compounds.append(('c%02d' % (index+1), 'C%02d' % (index+1)))
+  return compounds
+
+def generate_dataset(filename, rows=10000, locations=10, months=12, compound_count=3, correlation=0.5, seed=0):
+  """
+  Write rows readings of locations cities over the first months months of
+  2009 to filename. Returns the (item prefix, column) list of the
+  compounds, to use as the compounds setting.
+  """
+  if not 1 <= months <= len(MONTHS):
+    raise ValueError('months must be between 1 and 12')
+  if not 0 <= correlation <= 1:
+    raise ValueError('correlation must be between 0 and 1')
+  compounds = get_compounds(compound_count)
+  random = np.random.default_rng(seed)
+  cities = np.array(['City%d' % (location+1) for location in range(locations)], dtype=object)
+  with open(filename, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(HEADER + [column for prefix, column in compounds])
+    for start in range(0, rows, BLOCK_SIZE):
+      size = min(BLOCK_SIZE, rows-start)
+      location_ids = random.integers(0, locations, size)
+      month_numbers = random.integers(1, months+1, size)
+      days = random.integers(1, 29, size)
+      level = random.standard_normal(size)
+      noise = random.standard_normal((compound_count, size))
+      values = 50 + 15*(correlation*level + np.sqrt(1 - correlation**2)*noise)
+      values = np.round(np.clip(values, 0.1, None), 1)
+      for row in range(size):
+        city = cities[location_ids[row]]
+        date = '%d/%d/2009' % (days[row], month_numbers[row])
+        writer.writerow([date, 'State', city, city + ' Station', 'Residential'] + values[:, row].tolist())
+  return compounds
+
+def main():
+  parser = argparse.ArgumentParser(description='Write a synthetic spatio-temporal dataset.')
+  parser.add_argument('filename')
+  parser.add_argument('--rows', type=int, default=10000)
+  parser.add_argument('--locations', type=int, default=10)
+  parser.add_argument('--months', type=int, default=12)
+  parser.add_argument('--compounds', type=int, default=3)
+  parser.add_argument('--correlation', type=float, default=0.5)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+  compounds = generate_dataset(args.filename, args.rows, args.locations, args.months, args.compounds, args.correlation, args.seed)
+  print('compounds = ' + ', '.join(prefix + ':' + column for prefix, column in compounds))
+
+if '__main__' == __name__:
+  main()
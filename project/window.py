@@ -0,0 +1,116 @@
+import datetime
+from preprocess import get_discretisation_settings, iter_preprocessed_data
+from utils import print_table, get_config_info
+from encoding import get_item_key
+from cube import merge_counts
+from incremental import mine_cell, update_cell
+
+# a monday, so 7 day panes are calendar weeks
+PANE_ORIGIN = datetime.date(1970, 1, 5)
+
+def get_pane_counts(chunks, pane_days, items):
+  """
+  Group dated transactions into panes of pane_days days as
+  {first day of pane: {location: {item id tuple: count}}}, returned
+  with the first sampling date. The item names are appended to items,
+  the index being the item id.
+  """
+  item_index = {item: item_id for item_id, item in enumerate(items)}
+  pane_counts = {}
+  first_date = None
+  for chunk in chunks:
+    for transaction in chunk:
+      for item in transaction[0]:
+        if not item in item_index:
+          item_index[item] = len(items)
+          items.append(item)
+      date = transaction[3]
+      if first_date is None or date < first_date:
+        first_date = date
+      pane_start = date - datetime.timedelta(days=(date - PANE_ORIGIN).days % pane_days)
+      if not pane_start in pane_counts:
+        pane_counts[pane_start] = {}
+      if not transaction[1] in pane_counts[pane_start]:
+        pane_counts[pane_start][transaction[1]] = {}
+      transaction_counts = pane_counts[pane_start][transaction[1]]
+      items_ids = tuple(sorted(item_index[item] for item in transaction[0]))
+      transaction_counts[items_ids] = transaction_counts.get(items_ids, 0) + 1
+  return [pane_counts, first_date]
+
+def slide_window(pane_counts, window_panes, pane_days, item_count, min_support, first_date=None):
+  """
+  Slide a window of window_panes panes over the panes in date order and
+  yield (first day, last day, {location: [frequent, border]}) at every
+  step. A step adds the newest pane to the window counts and expires the
+  oldest one, and only the locations in those two panes have their
+  itemsets updated; the yielded dict is reused by the next step.
+  No window starts before first_date, the first sampling date.
+  """
+  if len(pane_counts) == 0:
+    return
+  step = datetime.timedelta(days=pane_days)
+  first_pane_start = min(pane_counts)
+  last_pane_start = max(pane_counts)
+  if first_date is None:
+    first_date = first_pane_start
+  window_counts = {}
+  itemsets_by_location = {}
+  pane_start = first_pane_start
+  while pane_start <= last_pane_start:
+    added = pane_counts.get(pane_start, {})
+    expired = pane_counts.get(pane_start - window_panes*step, {})
+    for location in set(added) | set(expired):
+      counts = merge_counts([window_counts.get(location, {}), added.get(location, {})])
+      for items_ids, count in expired.get(location, {}).items():
+        counts[items_ids] -= count
+        if counts[items_ids] == 0:
+          del counts[items_ids]
+      if len(counts) == 0:
+        del window_counts[location]
+        del itemsets_by_location[location]
+        continue
+      window_counts[location] = counts
+      itemsets = None
+      if location in itemsets_by_location:
+        itemsets = update_cell(itemsets_by_location[location], added.get(location, {}), item_count, min_support, expired.get(location))
+      if itemsets is None:
+        itemsets = mine_cell(counts, item_count, min_support)
+      itemsets_by_location[location] = itemsets
+    window_start = max(pane_start - (window_panes-1)*step, first_date)
+    yield (window_start, pane_start + step - datetime.timedelta(days=1), itemsets_by_location)
+    pane_start += step
+
+def get_window_itemsets(itemsets_by_location, items, label):
+  # {(location, label): [(itemset, count)]} of the itemsets of two or more items
+  window_itemsets = {}
+  for location, (frequent, border) in itemsets_by_location.items():
+    itemsets = []
+    for itemset in sorted(frequent, key=lambda itemset: (len(itemset), itemset)):
+      if len(itemset) > 1:
+        itemsets.append((tuple(sorted([items[item] for item in itemset], key=get_item_key)), frequent[itemset]))
+    if len(itemsets) > 0:
+      window_itemsets[(location, label)] = itemsets
+  return window_itemsets
+
+def main():
+  config_data = get_config_info()
+  MIN_SUPPORT_VALUE = int(config_data['min_support'])
+  filename = config_data['filename']
+  chunk_size = int(config_data.get('chunk_size', 10000))
+  settings = get_discretisation_settings(config_data)
+  pane_days = int(config_data.get('pane_days', 7))
+  window_panes = int(config_data.get('window_panes', 4))
+  items = []
+  pane_counts, first_date = get_pane_counts(iter_preprocessed_data(filename, chunk_size, settings, dated=True), pane_days, items)
+  print(20*'*')
+  print('Window of', window_panes, 'panes of', pane_days, 'days')
+  print('Min support value:', MIN_SUPPORT_VALUE)
+  print(20*'*')
+  for window_start, window_end, itemsets_by_location in slide_window(pane_counts, window_panes, pane_days, len(items), MIN_SUPPORT_VALUE, first_date):
+    label = window_start.strftime('%d/%m/%Y') + ' - ' + window_end.strftime('%d/%m/%Y')
+    window_itemsets = get_window_itemsets(itemsets_by_location, items, label)
+    if len(window_itemsets) > 0:
+      print_table(window_itemsets, 'Itemsets for ' + label)
+
+if '__main__' == __name__:
+  main()